@@ -0,0 +1,34 @@
+# compact_stock_history.py
+"""
+재고 이력 정리 스크립트 (streamlit 서버 없이 한 번 실행하고 종료)
+
+보존 정책(secrets의 stock_retention)에 따라 월별 재고 이력을 줄이고
+오래된 입력은 보관 파일로 옮깁니다. secrets는 streamlit과 같은 위치
+(.streamlit/secrets.toml)에서 읽습니다.
+
+사용법:
+    python compact_stock_history.py
+    
+    # 이력을 읽지 못하거나 저장에 실패하면 종료 코드 1 (예약 작업에서 실패 확인용)
+"""
+
+import sys
+
+from storage import StorageLoadError, compact_stock_history, format_compaction_summary
+
+def main():
+    """재고 이력 정리 후 종료 코드 반환"""
+    try:
+        summary = compact_stock_history()
+    except StorageLoadError as e:
+        print(f"❌ 재고 이력을 불러오지 못해 정리하지 않았습니다: {e}", file=sys.stderr)
+        return 1
+    
+    if summary is not None and summary["saved"] is False:
+        print("❌ 재고 이력 정리 저장 중 오류가 발생했습니다.", file=sys.stderr)
+        return 1
+    print(f"🗜️ 재고 이력 정리: {format_compaction_summary(summary)}")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,273 @@
+# product_catalog.py
+"""
+제품 카탈로그 모듈 (streamlit_app용)
+
+이 모듈은 출고 현황/재고 관리에서 쓰는 제품 키("식혜 1L")를
+한 번만 해석해서 SKU 정보(제품명, 용량, 박스 용량, 색상, 재고 부족 기준)로 제공합니다.
+
+사용법:
+    from product_catalog import get_sku
+    
+    sku = get_sku("식혜 1L")
+    # 결과: SKU(key="식혜 1L", product="식혜", capacity="1L", box_capacity="1L", ...)
+    
+    sku.input_key          # "식혜|1L" (재고 입력 키)
+    sku.style.card_text    # 출고 현황 카드 글자색
+    
+    standardize_capacity_for_display("200ML")  # "200ml"
+    standardize_capacity_for_box("200ML")      # "240ml"
+"""
+
+import functools
+import hashlib
+import re
+from collections import namedtuple
+from enum import Enum
+
+# 재고 부족 기준 (이 수량 이하이면 재고 부족으로 표시) - 항상 표시되는 전체 상품 목록이기도 함
+STOCK_THRESHOLDS = {
+    "단호박식혜 1.5L": 10,
+    "단호박식혜 1L": 20,
+    "단호박식혜 240ml": 50,
+    "식혜 1.5L": 20,
+    "식혜 1L": 10,
+    "식혜 240ml": 50,
+    "수정과 500ml": 50,
+    "플레인 쌀요거트 1L": 20,
+    "플레인 쌀요거트 200ml": 10,
+    "밥알없는 단호박식혜 1.5L": 1,
+    "밥알없는 단호박식혜 1L": 1,
+    "밥알없는 단호박식혜 240ml": 1,
+    "밥알없는 식혜 1.5L": 1,
+    "밥알없는 식혜 1L": 1,
+    "밥알없는 식혜 240ml": 1,
+}
+
+# 전체 상품 목록 (출고 현황과 관계없이 재고 관리에 항상 표시)
+CATALOG_PRODUCTS = tuple(STOCK_THRESHOLDS)
+
+# 제품 키 끝의 용량 표기 ("1L", "1.5L", "240ml" 등)
+CAPACITY_SUFFIX_PATTERN = re.compile(r'\d+(?:\.\d+)?(?:ml|L)')
+
+# 📏 표준 용량 (출고 현황/재고 관리 표시용, 박스 계산용 용량은 여기서 변환)
+class Capacity(Enum):
+    L1_5 = ("1.5L", "1.5L")
+    L1 = ("1L", "1L")
+    ML500 = ("500ml", "500ml")
+    ML240 = ("240ml", "240ml")
+    ML200 = ("200ml", "240ml")  # 박스 계산 시 200ml → 240ml 변환
+    
+    @property
+    def display(self):
+        """출고 현황/재고 관리 표시 용량 (200ml 그대로 표시)"""
+        return self.value[0]
+    
+    @property
+    def box(self):
+        """박스 계산용 용량"""
+        return self.value[1]
+
+# 용량 표기 → 표준 용량 (소문자 기준, 정확히 일치하는 표기)
+CAPACITY_LOOKUP = {
+    "1.5l": Capacity.L1_5,
+    "1l": Capacity.L1,
+    "1000ml": Capacity.L1,
+    "500ml": Capacity.ML500,
+    "240ml": Capacity.ML240,
+    "200ml": Capacity.ML200,
+}
+
+# 표에 없는 표기는 앞부분만 비교 (위에서부터 먼저 맞는 용량 적용)
+CAPACITY_PREFIX_PATTERN = re.compile(r'(1\.5L)|(1L|1000ml)|(500ml)|(240ml)|(200ml)', re.IGNORECASE)
+CAPACITY_PREFIX_GROUPS = (Capacity.L1_5, Capacity.L1, Capacity.ML500, Capacity.ML240, Capacity.ML200)
+
+# 용량 정규화 캐시 크기 (서로 다른 용량 표기 수)
+CAPACITY_CACHE_SIZE = 1024
+
+# 용량 정규화 정의 버전 (표준 용량 + 표기 규칙 내용 해시, 정의가 바뀔 때만 달라짐)
+CATALOG_VERSION = hashlib.sha256(repr((
+    [(capacity.name, capacity.value) for capacity in Capacity],
+    sorted((text, capacity.name) for text, capacity in CAPACITY_LOOKUP.items()),
+    CAPACITY_PREFIX_PATTERN.pattern, CAPACITY_PREFIX_PATTERN.flags,
+    [capacity.name for capacity in CAPACITY_PREFIX_GROUPS],
+    CAPACITY_SUFFIX_PATTERN.pattern,
+)).encode("utf-8")).hexdigest()[:12]
+
+# 🎨 제품별 색상
+# chart_color: 차트 색상 / card_*: 출고 현황 카드 / stock_*: 재고 현황 카드
+ProductStyle = namedtuple("ProductStyle", [
+    "chart_color",
+    "card_background", "card_text",
+    "stock_background", "stock_border", "stock_text",
+])
+
+# (포함 단어 중 하나, 제외 단어, 색상) - 위에서부터 먼저 맞는 규칙 적용
+PRODUCT_STYLE_RULES = [
+    # 밥알없는 단호박식혜 - 재고 카드만 진한 노란색
+    (("밥알없는 단호박식혜",), (), ProductStyle(
+        "#FFD700",
+        "linear-gradient(135deg, #ffd700 0%, #ffb300 100%)", "#4a4a4a",
+        "linear-gradient(135deg, #ffb300 0%, #ff8f00 100%)", "#ff6f00", "#4a4a4a",
+    )),
+    # 단호박식혜 - 노란색 계열
+    (("단호박식혜",), (), ProductStyle(
+        "#FFD700",
+        "linear-gradient(135deg, #ffd700 0%, #ffb300 100%)", "#4a4a4a",
+        "linear-gradient(135deg, #ffd700 0%, #ffb300 100%)", "#ff8f00", "#4a4a4a",
+    )),
+    # 밥알없는 식혜 - 재고 카드만 연한 갈색
+    (("밥알없는 식혜",), (), ProductStyle(
+        "#654321",
+        "linear-gradient(135deg, #d2b48c 0%, #bc9a6a 100%)", "#4a4a4a",
+        "linear-gradient(135deg, #deb887 0%, #d2b48c 100%)", "#cd853f", "#4a4a4a",
+    )),
+    # 수정과 - 진갈색 계열
+    (("수정과",), (), ProductStyle(
+        "#D2B48C",
+        "linear-gradient(135deg, #8b4513 0%, #654321 100%)", "#ffffff",
+        "linear-gradient(135deg, #8b4513 0%, #654321 100%)", "#654321", "#ffffff",
+    )),
+    # 식혜 - 연갈색 계열
+    (("식혜",), ("단호박",), ProductStyle(
+        "#654321",
+        "linear-gradient(135deg, #d2b48c 0%, #bc9a6a 100%)", "#4a4a4a",
+        "linear-gradient(135deg, #d2b48c 0%, #bc9a6a 100%)", "#8b7355", "#4a4a4a",
+    )),
+    # 플레인 쌀요거트 - 검정색 계열
+    (("플레인", "쌀요거트"), (), ProductStyle(
+        "#F5F5F5",
+        "linear-gradient(135deg, #2c2c2c 0%, #1a1a1a 100%)", "#ffffff",
+        "linear-gradient(135deg, #2c2c2c 0%, #1a1a1a 100%)", "#000000", "#ffffff",
+    )),
+]
+
+# 기타 상품 - 기본 초록색
+DEFAULT_PRODUCT_STYLE = ProductStyle(
+    "#808080",
+    "linear-gradient(135deg, #4caf50 0%, #2e7d32 100%)", "#ffffff",
+    "linear-gradient(135deg, #e8f5e8 0%, #c8e6c9 100%)", "#4caf50", "#2e7d32",
+)
+
+# SKU 정보
+# key: 제품 키 / product: 제품명 / capacity: 표시 용량 / box_capacity: 박스 계산 용량 (없으면 None)
+# input_key: 재고 입력 키 ("제품명|용량") / style: 색상 / threshold: 재고 부족 기준 (0이면 표시 안 함)
+SKU = namedtuple("SKU", ["key", "product", "capacity", "box_capacity", "input_key", "style", "threshold"])
+
+def split_product_key(product_key):
+    """제품 키 → (제품명, 용량) (끝에 용량 표기가 없으면 용량은 "")"""
+    parts = product_key.strip().split()
+    if len(parts) >= 2 and CAPACITY_SUFFIX_PATTERN.match(parts[-1]):
+        return ' '.join(parts[:-1]), parts[-1]
+    return product_key, ""
+
+@functools.lru_cache(maxsize=CAPACITY_CACHE_SIZE)
+def normalize_capacity(capacity):
+    """용량 표기 → 표준 용량 (서로 다른 표기마다 한 번만 해석, 표준 용량이 아니면 None)"""
+    if not capacity:
+        return None
+    
+    text = str(capacity)
+    canonical = CAPACITY_LOOKUP.get(text.lower())
+    if canonical is not None:
+        return canonical
+    
+    match = CAPACITY_PREFIX_PATTERN.match(text)
+    if match is None:
+        return None
+    return CAPACITY_PREFIX_GROUPS[match.lastindex - 1]
+
+def standardize_capacity_for_display(capacity):
+    """용량 표준화 - 출고 현황/재고 관리용 (200ml 그대로 표시, 표준 용량이 아니면 원래 표기)"""
+    canonical = normalize_capacity(capacity)
+    if canonical is not None:
+        return canonical.display
+    return str(capacity) if capacity else ""
+
+def standardize_capacity_for_box(capacity):
+    """용량 표준화 - 박스 계산용 (200ml → 240ml 변환, 표준 용량이 아니면 원래 표기)"""
+    canonical = normalize_capacity(capacity)
+    if canonical is not None:
+        return canonical.box
+    return str(capacity) if capacity else ""
+
+def get_product_style(product_name):
+    """제품명에 따른 색상"""
+    for includes, excludes, style in PRODUCT_STYLE_RULES:
+        if any(word in product_name for word in includes) and not any(word in product_name for word in excludes):
+            return style
+    return DEFAULT_PRODUCT_STYLE
+
+class ProductCatalog:
+    """제품 카탈로그 (제품 키 → SKU 색인)"""
+    
+    def __init__(self, product_keys=CATALOG_PRODUCTS):
+        """카탈로그 상품 SKU 미리 생성"""
+        self.index = {}
+        self.input_index = {}
+        for product_key in product_keys:
+            self.get_sku(product_key)
+    
+    def _build_sku(self, product_key):
+        """제품 키 해석 (키마다 한 번만)"""
+        product, capacity = split_product_key(product_key)
+        canonical = normalize_capacity(capacity)
+        return SKU(
+            key=product_key,
+            product=product,
+            capacity=capacity,
+            box_capacity=canonical.box if canonical else None,
+            input_key=f"{product}|{capacity}",
+            style=get_product_style(product),
+            threshold=STOCK_THRESHOLDS.get(product_key, 0),
+        )
+    
+    def get_sku(self, product_key):
+        """제품 키로 SKU 조회 (카탈로그에 없는 키는 처음 조회할 때 해석해서 색인에 추가)"""
+        sku = self.index.get(product_key)
+        if sku is None:
+            sku = self._build_sku(product_key)
+            self.index[product_key] = sku
+            self.input_index.setdefault(sku.input_key, sku)
+        return sku
+    
+    def get_sku_by_input_key(self, input_key):
+        """재고 입력 키("제품명|용량")로 SKU 조회"""
+        sku = self.input_index.get(input_key)
+        if sku is None:
+            product, capacity = input_key.split("|", 1)
+            sku = self.get_sku(f"{product} {capacity}".strip())
+            self.input_index[input_key] = sku
+        return sku
+
+# 전역 카탈로그 인스턴스 (싱글톤 패턴)
+_product_catalog = None
+
+def get_product_catalog():
+    """
+    전역 ProductCatalog 인스턴스 반환 (싱글톤)
+    
+    Returns:
+        ProductCatalog: 카탈로그 인스턴스
+    """
+    global _product_catalog
+    if _product_catalog is None:
+        _product_catalog = ProductCatalog()
+    return _product_catalog
+
+# 편의 함수들 (메인 코드에서 쉽게 사용할 수 있도록)
+def get_sku(product_key):
+    """제품 키("식혜 1L")로 SKU 조회 편의 함수"""
+    return get_product_catalog().get_sku(product_key)
+
+def get_sku_by_input_key(input_key):
+    """재고 입력 키("식혜|1L")로 SKU 조회 편의 함수"""
+    return get_product_catalog().get_sku_by_input_key(input_key)
+
+# 모듈 테스트 코드 (직접 실행 시에만)
+if __name__ == "__main__":
+    print("🧪 product_catalog.py 모듈 테스트")
+    print("=" * 50)
+    
+    for product_key in list(CATALOG_PRODUCTS) + ["기타"]:
+        sku = get_sku(product_key)
+        print(f"  {product_key:<22} → {sku.product} / {sku.capacity or '-'} / 박스 {sku.box_capacity} / 기준 {sku.threshold} / {sku.style.chart_color}")
@@ -10,207 +10,153 @@
     
     result = get_product_info("서로 식혜", "2개, 1000ml")
     # 결과: ("식혜", "1L", 2)
+    
+    results = get_product_info_many([("서로 식혜", "2개, 1000ml"), ("서로 식혜", "2개, 1000ml")])
+    # 결과: [("식혜", "1L", 2), ("식혜", "1L", 2)] - 중복 조합은 한 번만 조회
 """
 
+import functools
+import hashlib
+import re
+
 import pandas as pd
 
+# 매핑 결과 캐시 크기 (최근 사용한 (상품이름, 옵션이름) 조합 수)
+RESULT_CACHE_SIZE = 4096
+
+# 📋 예외 매핑 정의 (규칙 파서로 해석할 수 없는 케이스만)
+# (상품이름, 옵션이름, 제품분류, 용량, 개수) - 240ml는 2병 묶음 판매라 옵션에 개수 표기가 없어도 2개
+EXCEPTION_CASES = (
+    ("[서로 식혜] 1L 호박식혜 단호박식혜 수제 전통 국산 엿기름", "서로 식혜: 단호박식혜 / 용량: 240ml", "단호박식혜", "240ml", 2),
+    ("[서로 식혜] 1L 호박식혜 단호박식혜 수제 전통 국산 엿기름", "서로 식혜: 일반식혜 / 용량: 240ml", "식혜", "240ml", 2),
+)
+
+# 🧩 옵션 규칙 파서 패턴 (미리 컴파일)
+# 제품 분류: 위에서부터 먼저 맞는 규칙 적용 (옵션이름 → 상품이름 순서로 검색)
+FAMILY_PATTERNS = [
+    (re.compile(r'호박(?:\s*식혜)?'), '단호박식혜'),
+    (re.compile(r'수정과'), '수정과'),
+    (re.compile(r'요거트|플레인'), '플레인 쌀요거트'),
+    (re.compile(r'식혜'), '식혜'),
+]
+
+# 용량: "1000ml", "1L", "1.5L", "240ml" 등 (옵션이름 → 상품이름 순서, 마지막 표기 사용)
+CAPACITY_PATTERN = re.compile(r'(\d+(?:\.\d+)?)\s*(ml|l)(?![a-z])', re.IGNORECASE)
+
+# 개수: "N개" / "N병" (마지막 표기 사용) 또는 용량 바로 앞의 숫자 ("1, 1L", "2 1000ml")
+COUNT_PATTERN = re.compile(r'(\d+)\s*(?:개|병)')
+BARE_COUNT_PATTERN = re.compile(r'(?:^|[\s,])(\d+)\s*[\s,]\s*\d+(?:\.\d+)?\s*(?:ml|l)(?![a-z])', re.IGNORECASE)
+
+# 옵션 항목 이름 ("서로 식혜:", "용량 :") - 제품 분류는 값 부분에서 먼저 찾음
+OPTION_LABEL_PATTERN = re.compile(r'[^:/,]*:')
+
+# 개수로 해석하지 않는 묶음/배수 표기 ("식혜 + 수정과", "1L x 3", "2세트") - 있으면 기타로 분류
+UNSUPPORTED_COUNT_PATTERN = re.compile(
+    r'\+|[×*]\s*\d|(?<![a-z])x\s*\d|\d\s*x(?![a-z])|\d\s*(?:세트|set|묶음|팩|박스|box)',
+    re.IGNORECASE
+)
+
+# 표준 용량 (ml 기준)
+STANDARD_CAPACITIES = {200: "200ml", 240: "240ml", 500: "500ml", 1000: "1L", 1500: "1.5L"}
+
+# 매핑 정의 버전 (예외 테이블 + 파서 규칙 내용 해시, 정의가 바뀔 때만 달라짐)
+MAPPING_VERSION = hashlib.sha256(repr((
+    EXCEPTION_CASES,
+    [(pattern.pattern, product_type) for pattern, product_type in FAMILY_PATTERNS],
+    CAPACITY_PATTERN.pattern, COUNT_PATTERN.pattern, BARE_COUNT_PATTERN.pattern,
+    OPTION_LABEL_PATTERN.pattern, UNSUPPORTED_COUNT_PATTERN.pattern,
+    sorted(STANDARD_CAPACITIES.items()),
+)).encode("utf-8")).hexdigest()[:12]
+
+def _parse_family(text):
+    """문자열에서 제품 분류 추출"""
+    for pattern, product_type in FAMILY_PATTERNS:
+        if pattern.search(text):
+            return product_type
+    return None
+
+def _parse_families(text):
+    """문자열의 제품 분류 목록 (규칙 순서대로, 맞은 부분은 지우고 다음 규칙 검색)"""
+    families = []
+    for pattern, product_type in FAMILY_PATTERNS:
+        text, matched = pattern.subn(' ', text)
+        if matched and product_type not in families:
+            families.append(product_type)
+    return families
+
+def _parse_milliliters(text):
+    """문자열의 용량 표기 목록 (ml 기준, 같은 용량은 한 번만)"""
+    milliliters = []
+    for value, unit in CAPACITY_PATTERN.findall(text):
+        amount = float(value) * (1000 if unit.lower() == "l" else 1)
+        if amount not in milliliters:
+            milliliters.append(amount)
+    return milliliters
+
+def _parse_capacity(text):
+    """문자열에서 표준 용량 추출 (표준 용량이 아니면 None)"""
+    milliliters = _parse_milliliters(text)
+    if not milliliters:
+        return None
+    return STANDARD_CAPACITIES.get(milliliters[-1])
+
+def _parse_count(option_name):
+    """옵션이름에서 개수 추출 (표기가 없으면 1개)"""
+    matches = COUNT_PATTERN.findall(option_name) or BARE_COUNT_PATTERN.findall(option_name)
+    return int(matches[-1]) if matches else 1
+
+@functools.lru_cache(maxsize=RESULT_CACHE_SIZE)
+def parse_product_option(product_name, option_name):
+    """
+    규칙 기반 옵션 파싱 (매핑 테이블에 없는 표기용)
+    
+    Args:
+        product_name (str): 상품이름 (공백 제거된 값)
+        option_name (str): 옵션이름 (공백 제거된 값)
+    
+    Returns:
+        tuple: (제품분류, 용량, 개수) 또는 해석할 수 없으면 None
+    """
+    # 옵션에 서로 다른 제품/용량이 함께 있거나 해석하지 않는 묶음 표기가 있으면 기타
+    families = _parse_families(OPTION_LABEL_PATTERN.sub(' ', option_name)) or _parse_families(option_name)
+    milliliters = _parse_milliliters(option_name)
+    counts = set(COUNT_PATTERN.findall(option_name))
+    if len(families) > 1 or len(milliliters) > 1 or len(counts) > 1 or UNSUPPORTED_COUNT_PATTERN.search(option_name):
+        return None
+    
+    product_type = families[0] if families else _parse_family(product_name)
+    capacity = STANDARD_CAPACITIES.get(milliliters[0]) if milliliters else _parse_capacity(product_name)
+    if not product_type or not capacity:
+        return None
+    
+    return (product_type, capacity, _parse_count(option_name))
+
 class ProductMapper:
     """제품 매핑 처리 클래스"""
     
-    def __init__(self):
-        """매핑 테이블 초기화"""
-        self.mapping_table = self._build_complete_mapping_table()
-        print(f"✅ ProductMapper 초기화 완료: {len(self.mapping_table)}개 케이스 로드됨")
+    def __init__(self, cache_size=RESULT_CACHE_SIZE):
+        """매퍼 초기화 (매핑 테이블은 첫 조회 시 생성)"""
+        self._mapping_table = None
+        # 원본 조합 기준 LRU 캐시 (매핑 실패한 기타 결과도 캐시)
+        self._cached_lookup = functools.lru_cache(maxsize=cache_size, typed=True)(self._lookup)
     
-    def _build_complete_mapping_table(self):
-        """완전한 매핑 테이블 생성 (모든 패턴 포함)"""
-        mapping = {}
-        
-        # 기본 케이스들 (9개)
-        basic_cases = [
-            ("플레인 쌀요거트:", "플레인 쌀요거트 200ml", "플레인 쌀요거트", "200ml", 1),
-            ("플레인 쌀요거트:", "플레인 쌀요거트 1L", "플레인 쌀요거트", "1L", 1),
-            ("플레인 200ml", "서로 쌀요거트 플레인 무설탕 무유당 비건, 1개, 200ml", "플레인 쌀요거트", "200ml", 1),
-            ("플레인 200ml", "서로 쌀요거트 플레인 무설탕 무유당 비건, 1, 200ml", "플레인 쌀요거트", "200ml", 1),
-            ("[서로 쌀요거트] 쌀누룩 비건 요거트 무설탕 마시는요거트 수제 대용량 플레인 1L", "", "플레인 쌀요거트", "1L", 1),  # 공란 케이스
-            ("[서로 쌀요거트] 무설탕 수제 비건 마시는요거트", "[서로 쌀요거트] 무설탕 수제 비건 마시는요거트 : 200ml 5병", "플레인 쌀요거트", "200ml", 5),
-            ("서로 식혜", "2개, 1000ml", "식혜", "1L", 2),
-            ("서로 단호박식혜", "2개, 1000ml", "단호박식혜", "1L", 2),
-            ("단호박식혜", "[서로 ] 수제 단호박 통째로, 10개, 240ml", "단호박식혜", "240ml", 10),
-        ]
-        
-        # 기본 케이스 추가
-        for case_data in basic_cases:
-            key = (case_data[0], case_data[1])
-            mapping[key] = (case_data[2], case_data[3], case_data[4])
-        
-        # 동적 케이스들 추가
-        mapping.update(self._build_dynamic_cases())
-        
-        return mapping
+    @property
+    def mapping_table(self):
+        """예외 매핑 테이블 (지연 생성)"""
+        if self._mapping_table is None:
+            self._mapping_table = self._build_complete_mapping_table()
+        return self._mapping_table
     
-    def _build_dynamic_cases(self):
-        """동적 케이스들 생성 - 모든 패턴 포함 (기존 + 쉼표 없음 + 중복 숫자)"""
-        dynamic_mapping = {}
-        
-        # 케이스 4: 서로 플레인 쌀요거트 (1~4개) - 3가지 패턴
-        for count in range(1, 5):
-            # 패턴 1: 기존 (쉼표 있음)
-            key = ("서로 플레인 쌀요거트", f"{count}개, 1000ml")
-            dynamic_mapping[key] = ("플레인 쌀요거트", "1L", count)
-            # 패턴 2: 새로운 (쉼표 없음)
-            key = ("서로 플레인 쌀요거트", f"{count}개 1000ml")
-            dynamic_mapping[key] = ("플레인 쌀요거트", "1L", count)
-            # 패턴 3: 중복 숫자 (새로운 엑셀)
-            key = ("서로 플레인 쌀요거트", f"{count} {count}개 1000ml")
-            dynamic_mapping[key] = ("플레인 쌀요거트", "1L", count)
-        
-        # 케이스 5: 서로 쌀요거트 플레인 무가당 무유당 비건 (1~4개, "개" 포함) - 3가지 패턴
-        for count in range(1, 5):
-            # 패턴 1: 기존 (쉼표 있음)
-            key = ("서로 쌀요거트 플레인 무가당 무유당 비건", f"{count}개, 1L")
-            dynamic_mapping[key] = ("플레인 쌀요거트", "1L", count)
-            # 패턴 2: 새로운 (쉼표 없음)
-            key = ("서로 쌀요거트 플레인 무가당 무유당 비건", f"{count}개 1L")
-            dynamic_mapping[key] = ("플레인 쌀요거트", "1L", count)
-            # 패턴 3: 중복 숫자 (새로운 엑셀)
-            key = ("서로 쌀요거트 플레인 무가당 무유당 비건", f"{count} {count}개 1L")
-            dynamic_mapping[key] = ("플레인 쌀요거트", "1L", count)
-            key = ("서로 쌀요거트 플레인 무가당 무유당 비건", f"{count} {count}개 1000ml")
-            dynamic_mapping[key] = ("플레인 쌀요거트", "1L", count)
-        
-        # 케이스 6: 서로 쌀요거트 플레인 무가당 무유당 비건 (1~4개, "개" 없음) - 3가지 패턴
-        for count in range(1, 5):
-            # 패턴 1: 기존 (쉼표 있음)
-            key = ("서로 쌀요거트 플레인 무가당 무유당 비건", f"{count}, 1L")
-            dynamic_mapping[key] = ("플레인 쌀요거트", "1L", count)
-            # 패턴 2: 새로운 (쉼표 없음)
-            key = ("서로 쌀요거트 플레인 무가당 무유당 비건", f"{count} 1L")
-            dynamic_mapping[key] = ("플레인 쌀요거트", "1L", count)
-        
-        # 케이스 7: 서로 쌀요거트 플레인 무가당 무유당 비건 (1~4개, 1000ml) - 3가지 패턴
-        for count in range(1, 5):
-            # 패턴 1: 기존 (쉼표 있음)
-            key = ("서로 쌀요거트 플레인 무가당 무유당 비건", f"{count}, 1000ml")
-            dynamic_mapping[key] = ("플레인 쌀요거트", "1L", count)
-            # 패턴 2: 새로운 (쉼표 없음)
-            key = ("서로 쌀요거트 플레인 무가당 무유당 비건", f"{count} 1000ml")
-            dynamic_mapping[key] = ("플레인 쌀요거트", "1L", count)
-        
-        # 케이스 추가: 플레인 200ml - 중복 숫자 패턴
-        for count in range(1, 5):
-            key = ("플레인 200ml", f"{count} {count}개 200ml")
-            dynamic_mapping[key] = ("플레인 쌀요거트", "200ml", count)
-        
-        # 케이스 11: [서로 ] 수제 단호박 통째로 (2~6개) - 2가지 패턴
-        for count in range(2, 7):
-            # 패턴 1: 기존 (쉼표 있음)
-            key = ("단호박식혜", f"[서로 ] 수제 단호박 통째로, {count}개, 1L")
-            dynamic_mapping[key] = ("단호박식혜", "1L", count)
-            # 패턴 2: 새로운 (쉼표 없음)
-            key = ("단호박식혜", f"[서로 ] 수제 단호박 통째로 {count}개 1L")
-            dynamic_mapping[key] = ("단호박식혜", "1L", count)
-        
-        # 케이스 12: 자일로스설탕... (2~4개) - 2가지 패턴
-        for count in range(2, 5):
-            # 패턴 1: 기존 (쉼표 있음)
-            key = ("단호박식혜", f" 자일로스설탕 밥알없는 단유 수제 감주 호박 식혜, {count}개, 1L")
-            dynamic_mapping[key] = ("단호박식혜", "1L", count)
-            # 패턴 2: 새로운 (쉼표 없음)
-            key = ("단호박식혜", f" 자일로스설탕 밥알없는 단유 수제 감주 호박 식혜 {count}개 1L")
-            dynamic_mapping[key] = ("단호박식혜", "1L", count)
-        
-        # 케이스 13: [서로 진하고 깊은 식혜] (2~10개, 240ml/1L) - 2가지 패턴
-        for count in range(2, 11):
-            for capacity in ["240ml", "1L"]:
-                # 패턴 1: 기존 (쉼표 있음)
-                key = ("[서로 진하고 깊은 식혜] 전통 국산 수제 식혜", f"{count}개, {capacity}")
-                dynamic_mapping[key] = ("식혜", capacity, count)
-                # 패턴 2: 새로운 (쉼표 없음)
-                key = ("[서로 진하고 깊은 식혜] 전통 국산 수제 식혜", f"{count}개 {capacity}")
-                dynamic_mapping[key] = ("식혜", capacity, count)
-        
-        # 케이스 16: [서로 식혜] 수제 전통 국산 엿기름 (2~5개, 240ml/1L) - 2가지 패턴
-        for count in range(2, 6):
-            for capacity in ["240ml", "1L"]:
-                # 패턴 1: 기존 (쉼표 있음)
-                key = ("[서로 식혜] 수제 전통 국산 엿기름", f"서로 식혜 : {capacity}, {count}병")
-                dynamic_mapping[key] = ("식혜", capacity, count)
-                # 패턴 2: 새로운 (쉼표 없음)
-                key = ("[서로 식혜] 수제 전통 국산 엿기름", f"서로 식혜 : {capacity} {count}병")
-                dynamic_mapping[key] = ("식혜", capacity, count)
-
-        # ✅ 먼저 capacities_17 정의        
-        capacities_17 = [("240ml", 2), ("1L", 1), ("1.5L", 1)]
-        
-        # ✅ 추가: "2병" 표기가 있는 케이스들
-        for capacity, count in capacities_17:
-            if capacity == "240ml":  # 240ml만 "2병" 표기 추가
-                key = ("[서로 식혜] 1L 호박식혜 단호박식혜 수제 전통 국산 엿기름", f"서로 식혜: 단호박식혜 / 용량: {capacity} {count}병")
-                dynamic_mapping[key] = ("단호박식혜", capacity, count)
-                
-                key = ("[서로 식혜] 1L 호박식혜 단호박식혜 수제 전통 국산 엿기름", f"서로 식혜: 일반식혜 / 용량: {capacity} {count}병")
-                dynamic_mapping[key] = ("식혜", capacity, count)
-
-        # 케이스 17: 단호박식혜 (240ml는 2개 고정, 1L/1.5L은 1개)
-        for capacity, count in capacities_17:
-            key = ("[서로 식혜] 1L 호박식혜 단호박식혜 수제 전통 국산 엿기름", f"서로 식혜: 단호박식혜 / 용량: {capacity}")
-            dynamic_mapping[key] = ("단호박식혜", capacity, count)
-        
-        # 케이스 18: 일반식혜 (240ml는 2개 고정, 1L/1.5L은 1개)
-        for capacity, count in capacities_17:
-            key = ("[서로 식혜] 1L 호박식혜 단호박식혜 수제 전통 국산 엿기름", f"서로 식혜: 일반식혜 / 용량: {capacity}")
-            dynamic_mapping[key] = ("식혜", capacity, count)
-        
-        # 케이스 19: [서로 수정과] 수제 전통 (3, 5, 10개) - 2가지 패턴
-        for count in [3, 5, 10]:
-            # 패턴 1: 기존 (쉼표 있음)
-            key = ("[서로 수정과] 수제 전통", f"{count}개, 500ml")
-            dynamic_mapping[key] = ("수정과", "500ml", count)
-            # 패턴 2: 새로운 (쉼표 없음)
-            key = ("[서로 수정과] 수제 전통", f"{count}개 500ml")
-            dynamic_mapping[key] = ("수정과", "500ml", count)
-        
-        # 케이스 20, 21: [서로 수정과] 500ml 수제 전통
-        dynamic_mapping[("[서로 수정과] 500ml 수제 전통", "서로 수정과 : 500ml 3병")] = ("수정과", "500ml", 3)
-        dynamic_mapping[("[서로 수정과] 500ml 수제 전통", "서로 수정과 : 500ml 5병")] = ("수정과", "500ml", 5)
-        
-        # 케이스 22: [서로 수정과] 500ml 3병 피라미딩... (3, 5개)
-        for count in [3, 5]:
-            key = ("[서로 수정과] 500ml 3병 피라미딩 수정과 수제 전통", f"서로 수정과 500ml: 500ml {count}병")
-            dynamic_mapping[key] = ("수정과", "500ml", count)
-        
-        # 케이스 23: [서로 단호박식혜] 수제 전통 1L... (1~10병, 240ml는 5,10개만)
-        for count in range(1, 11):
-            key = ("[서로 단호박식혜] 수제 전통 1L 국산 엿기름", f"서로 단호박식혜 : 단호박식혜, 용량 : 1L {count}병")
-            dynamic_mapping[key] = ("단호박식혜", "1L", count)
-        
-        for count in [5, 10]:  # 240ml는 5, 10개만
-            key = ("[서로 단호박식혜] 수제 전통 1L 국산 엿기름", f"서로 단호박식혜 : 단호박식혜, 용량 : 240ml {count}병")
-            dynamic_mapping[key] = ("단호박식혜", "240ml", count)
-        
-        # 케이스 24: [서로 단호박식혜] 수제 단호박 통째로 (2~10개, 240ml는 5,10개만) - 2가지 패턴
-        for count in range(2, 11):
-            # 패턴 1: 기존 (쉼표 있음)
-            key = ("[서로 단호박식혜] 수제 단호박 통째로", f"{count}개, 1L")
-            dynamic_mapping[key] = ("단호박식혜", "1L", count)
-            # 패턴 2: 새로운 (쉼표 없음)
-            key = ("[서로 단호박식혜] 수제 단호박 통째로", f"{count}개 1L")
-            dynamic_mapping[key] = ("단호박식혜", "1L", count)
-        
-        for count in [5, 10]:  # 240ml는 5, 10개만
-            # 패턴 1: 기존 (쉼표 있음)
-            key = ("[서로 단호박식혜] 수제 단호박 통째로", f"{count}개, 240ml")
-            dynamic_mapping[key] = ("단호박식혜", "240ml", count)
-            # 패턴 2: 새로운 (쉼표 없음)
-            key = ("[서로 단호박식혜] 수제 단호박 통째로", f"{count}개 240ml")
-            dynamic_mapping[key] = ("단호박식혜", "240ml", count)
-        
-        return dynamic_mapping
+    def _build_complete_mapping_table(self):
+        """예외 매핑 테이블 생성 (EXCEPTION_CASES → 조회용 dict)"""
+        return {
+            (product_name, option_name): (product_type, capacity, count)
+            for product_name, option_name, product_type, capacity, count in EXCEPTION_CASES
+        }
     
     def get_product_info(self, product_name, option_name):
         """
-        제품 정보 추출 (이중 매핑 시도)
+        제품 정보 추출 (이중 매핑 시도, 결과 캐시)
         
         Args:
             product_name (str): 상품이름
@@ -219,6 +165,38 @@ class ProductMapper:
         Returns:
             tuple: (제품분류, 용량, 개수)
         """
+        try:
+            return self._cached_lookup(product_name, option_name)
+        except TypeError:
+            # 해시할 수 없는 값은 캐시 없이 처리
+            return self._lookup(product_name, option_name)
+    
+    def get_product_info_many(self, pairs):
+        """
+        여러 조합의 제품 정보 일괄 추출 (중복 조합은 한 번만 조회)
+        
+        Args:
+            pairs (iterable): [(product_name, option_name), ...]
+        
+        Returns:
+            list: 입력 순서대로 (제품분류, 용량, 개수) 목록
+        """
+        resolved = {}
+        results = []
+        for pair in pairs:
+            try:
+                result = resolved.get(pair)
+            except TypeError:
+                # 해시할 수 없는 값(목록 셀 등)은 중복 확인 없이 조회
+                results.append(self.get_product_info(*pair))
+                continue
+            if result is None:
+                result = resolved[pair] = self.get_product_info(*pair)
+            results.append(result)
+        return results
+    
+    def _lookup(self, product_name, option_name):
+        """매핑 테이블 조회 (캐시 없음)"""
         # 공란 처리
         if pd.isna(option_name) or option_name is None:
             option_name = ""
@@ -233,8 +211,17 @@ class ProductMapper:
         if stripped_key in self.mapping_table:
             return self.mapping_table[stripped_key]
         
-        # 둘 다 실패하면 기타로 분류
-        return ("기타", "", 1)    
+        # ✅ 3차 시도: 규칙 파서로 개수/용량/제품 추출
+        parsed = parse_product_option(*stripped_key)
+        if parsed:
+            return parsed
+        
+        # 모두 실패하면 기타로 분류
+        return ("기타", "", 1)
+    
+    def get_cache_info(self):
+        """매핑 결과 캐시 통계 (hits, misses, maxsize, currsize)"""
+        return self._cached_lookup.cache_info()
         
     def get_mapping_stats(self):
         """
@@ -251,7 +238,8 @@ class ProductMapper:
         
         return {
             'total_cases': len(self.mapping_table),
-            'product_stats': product_stats
+            'product_stats': product_stats,
+            'version': MAPPING_VERSION
         }
     
     def validate_sample_data(self, sample_data):
@@ -315,6 +303,19 @@ def get_product_info(product_name, option_name):
     mapper = get_product_mapper()
     return mapper.get_product_info(product_name, option_name)
 
+def get_product_info_many(pairs):
+    """
+    제품 정보 일괄 추출 편의 함수
+    
+    Args:
+        pairs (iterable): [(product_name, option_name), ...]
+    
+    Returns:
+        list: 입력 순서대로 (제품분류, 용량, 개수) 목록
+    """
+    mapper = get_product_mapper()
+    return mapper.get_product_info_many(pairs)
+
 def get_mapping_stats():
     """매핑 통계 정보 편의 함수"""
     mapper = get_product_mapper()
@@ -334,7 +335,7 @@ if __name__ == "__main__":
     mapper = get_product_mapper()
     stats = get_mapping_stats()
     
-    print(f"✅ 총 {stats['total_cases']}개의 매핑 케이스 로드 완료!")
+    print(f"✅ 총 {stats['total_cases']}개의 매핑 케이스 로드 완료! (버전 {stats['version']})")
     print("\n📊 제품별 케이스 수:")
     for product, count in sorted(stats['product_stats'].items()):
         print(f"  - {product}: {count}개")
@@ -357,6 +358,12 @@ if __name__ == "__main__":
         ("서로 쌀요거트 플레인 무가당 무유당 비건", "1 1개 1L"),
         ("플레인 200ml", "1 1개 200ml"),
         
+        # 예외 테이블 (240ml 2병 묶음)
+        ("[서로 식혜] 1L 호박식혜 단호박식혜 수제 전통 국산 엿기름", "서로 식혜: 일반식혜 / 용량: 240ml"),
+        
+        # 새로운 마켓 표기 (규칙 파서)
+        ("[서로 식혜] 수제 전통 국산 엿기름", "서로 식혜 : 1.5L / 3병"),
+        
         # 실패 케이스
         ("없는제품", "없는옵션")
     ]
@@ -370,4 +377,19 @@ if __name__ == "__main__":
     validation = validate_sample_data(test_cases)
     print(f"\n📈 테스트 결과: {validation['success_count']}/{validation['total_count']} ({validation['success_rate']:.1f}%)")
     
+    # 여러 제품/묶음 표기 - 추측하지 않고 기타로 분류해야 하는 케이스
+    print("\n🧪 기타 분류 테스트:")
+    ambiguous_cases = [
+        ("식혜 선물세트", "식혜 1L + 수정과 500ml"),  # 두 제품
+        ("서로 식혜", "1L x 3"),                     # 배수 표기
+        ("식혜", "10개 1L 2세트"),                   # 세트 표기
+        ("서로 식혜", "식혜 1L / 단호박식혜 1L"),     # 두 제품 분류
+        ("서로 식혜", "1L 2개, 1.5L 1개"),           # 두 용량
+    ]
+    for product_name, option_name in ambiguous_cases:
+        result = get_product_info(product_name, option_name)
+        status = "✅" if result == ("기타", "", 1) else "❌"
+        print(f"{status} '{product_name}' + '{option_name}' → {result}")
+        assert result == ("기타", "", 1), (product_name, option_name, result)
+    
     print("\n🎉 모듈 테스트 완료!")
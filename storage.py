@@ -0,0 +1,906 @@
+# storage.py
+"""
+저장소 모듈 (streamlit_app / 재고 이력 정리 스크립트용)
+
+이 모듈은 출고/박스/재고 데이터를 암호화해서 저장소 백엔드(GitHub, 로컬 파일, SQLite)에
+저장하고 불러오며, 재고 이력(월별 파일, 보존 정책에 따른 정리)을 관리합니다.
+페이지를 그리지 않으므로 streamlit 서버 없이도 가져다 쓸 수 있습니다.
+
+사용법:
+    from storage import load_stock_data, compact_stock_history
+    
+    stock_results, last_update = load_stock_data()
+    summary = compact_stock_history()
+"""
+
+import streamlit as st
+import json
+import base64
+import zlib
+import requests
+from requests.adapters import HTTPAdapter
+from concurrent.futures import ThreadPoolExecutor
+from streamlit.runtime.scriptrunner import add_script_run_ctx, get_script_run_ctx
+from cryptography.fernet import Fernet
+import os
+import sqlite3
+import tempfile
+import copy
+import threading
+import time
+from abc import ABC, abstractmethod
+from datetime import datetime, timezone, timedelta
+
+# 한국 시간대 설정
+KST = timezone(timedelta(hours=9))
+
+# GitHub 설정 - 수정된 저장소명
+REPO_OWNER = "coder4052"  # 본인 GitHub 사용자명으로 변경하세요
+REPO_NAME = "seroe"  # 실제 생성한 저장소명
+SHIPMENT_FILE_PATH = "data/출고현황_encrypted.json"
+BOX_FILE_PATH = "data/박스계산_encrypted.json"
+STOCK_FILE_PATH = "data/재고현황_encrypted.json"
+UPLOAD_INDEX_FILE_PATH = "data/업로드색인_encrypted.json"
+
+# 재고 이력 - 월별 파일에 시간순으로 추가 (스냅샷 + 이전 입력 대비 변경분)
+STOCK_HISTORY_PATH_TEMPLATE = "data/재고이력/{month}_encrypted.json"
+STOCK_SNAPSHOT_INTERVAL = 20  # 월별 파일 안에서 전체 스냅샷을 남기는 간격 (기록 수)
+STOCK_ARCHIVE_PATH = "data/재고이력/보관_encrypted.json"
+
+# 재고 이력 보존 정책 (secrets의 stock_retention으로 변경 가능)
+# full_days 이내: 모든 입력 / daily_days 이내: 날짜별 마지막 입력 / 그 이전: 주별 마지막 입력만 보관 파일로
+STOCK_RETENTION = {"full_days": 30, "daily_days": 180}
+
+# GitHub 로드 캐시 - TTL 안에서는 요청 없이 재사용, 이후에는 ETag로 변경 여부만 확인
+GITHUB_CACHE_TTL = 30  # 초
+
+# 저장 파일 형식 버전
+# 1: 들여쓴 JSON 안에 base64(Fernet(JSON)) (기존 형식, 읽기만 지원)
+# 2: 압축 JSON 안에 Fernet(zlib(압축 JSON)) 토큰 그대로 저장
+PAYLOAD_FORMAT = 2
+PAYLOAD_COMPRESSION_LEVEL = 6
+
+# 저장소 백엔드 기본 위치 (secrets의 storage_backend / storage_path로 변경)
+DEFAULT_STORAGE_BACKEND = "github"  # "github" | "local" | "sqlite"
+DEFAULT_LOCAL_STORAGE_DIR = os.path.dirname(os.path.abspath(__file__))
+DEFAULT_SQLITE_PATH = os.path.join(DEFAULT_LOCAL_STORAGE_DIR, "data", "seroe.db")
+
+# 페이지 시작 시 함께 불러오는 데이터 파일 (결과 키 → 파일 경로)
+DATA_FILES = {
+    "shipment": SHIPMENT_FILE_PATH,
+    "box": BOX_FILE_PATH,
+    "stock": STOCK_FILE_PATH,
+    "upload_index": UPLOAD_INDEX_FILE_PATH,
+}
+
+class StorageLoadError(Exception):
+    """저장소에서 파일을 읽지 못함 (네트워크/HTTP/복호화/형식 오류 - 파일 없음과 구분)"""
+
+def get_fernet():
+    """secrets의 암호화 키로 Fernet 생성"""
+    return Fernet(st.secrets["encryption_key"].encode())
+
+def encrypt_results(results):
+    """집계 결과 암호화 (형식 2: 압축 JSON → zlib → Fernet 토큰)"""
+    try:
+        json_bytes = json.dumps(results, ensure_ascii=False, separators=(",", ":")).encode()
+        compressed = zlib.compress(json_bytes, PAYLOAD_COMPRESSION_LEVEL)
+        return get_fernet().encrypt(compressed).decode()
+    except Exception as e:
+        st.error(f"암호화 중 오류: {e}")
+        return None
+
+def decrypt_results(encrypted_data, payload_format=PAYLOAD_FORMAT):
+    """암호화된 결과 복호화 (형식 1: base64로 한 번 더 감싼 비압축 JSON, 실패 시 None)"""
+    try:
+        f = get_fernet()
+        
+        if payload_format >= 2:
+            decrypted_data = zlib.decompress(f.decrypt(encrypted_data.encode()))
+        else:
+            decrypted_data = f.decrypt(base64.b64decode(encrypted_data.encode()))
+        return json.loads(decrypted_data.decode())
+    except Exception as e:
+        st.error(f"복호화 중 오류: {e}")
+        return None
+
+def build_data_package(data):
+    """저장용 파일 내용 생성 (형식 버전 + 암호화 데이터 + 저장 시각 JSON, 암호화 실패 시 None)"""
+    encrypted_data = encrypt_results(data)
+    if not encrypted_data:
+        return None
+    
+    now = datetime.now(KST)
+    data_package = {
+        'format': PAYLOAD_FORMAT,
+        'encrypted_data': encrypted_data,
+        'last_update': now.isoformat(),
+        'timestamp': now.timestamp()
+    }
+    return json.dumps(data_package, ensure_ascii=False, separators=(",", ":"))
+
+def parse_data_package(package_text):
+    """저장 파일 내용 → (결과, 저장 시각) (형식 버전이 없으면 형식 1, 읽을 수 없으면 StorageLoadError)"""
+    try:
+        data = json.loads(package_text)
+    except ValueError as e:
+        raise StorageLoadError(f"저장 파일 형식 오류: {e}") from e
+    
+    encrypted_results = data.get('encrypted_data')
+    if not encrypted_results:
+        raise StorageLoadError("암호화 데이터가 없습니다")
+    
+    results = decrypt_results(encrypted_results, data.get('format', 1))
+    if results is None:
+        raise StorageLoadError("복호화 실패")
+    last_update_str = data.get('last_update')
+    last_update = datetime.fromisoformat(last_update_str) if last_update_str else None
+    return results, last_update
+
+def build_data_packages(files):
+    """파일 경로 → 데이터 묶음을 저장 파일 내용으로 변환 (None은 삭제로 유지, 암호화 실패 시 None)"""
+    packages = {}
+    for file_path, data in files.items():
+        if data is None:
+            packages[file_path] = None
+            continue
+        package_text = build_data_package(data)
+        if not package_text:
+            return None
+        packages[file_path] = package_text
+    return packages
+
+def save_to_github(data, file_path, commit_message):
+    """GitHub에 암호화된 데이터 저장 (공통 함수)"""
+    try:
+        client = get_github_client()
+        
+        package_text = build_data_package(data)
+        if not package_text:
+            return False
+        content = base64.b64encode(package_text.encode()).decode()
+        
+        # 재시도 로직 추가
+        max_retries = 3
+        for attempt in range(max_retries):
+            try:
+                response = client.put_contents(file_path, content, commit_message)
+                
+                if response.status_code in [200, 201]:
+                    invalidate_github_cache(file_path)
+                    return True
+                else:
+                    st.warning(f"GitHub 저장 실패 (시도 {attempt + 1}/{max_retries}): {response.status_code}")
+                    
+            except requests.exceptions.RequestException as e:
+                st.warning(f"네트워크 오류 (시도 {attempt + 1}/{max_retries}): {str(e)}")
+                
+            if attempt < max_retries - 1:
+                time.sleep(2 ** attempt)  # 지수 백오프
+        
+        return False
+        
+    except Exception as e:
+        st.error(f"GitHub 저장 중 오류: {e}")
+        return False
+
+def save_many_to_github(files, commit_message):
+    """여러 파일을 하나의 커밋으로 저장 (Git Data API) - 모두 반영되거나 하나도 반영되지 않음
+    
+    Args:
+        files (dict): 파일 경로 → 저장할 데이터 (None이면 파일 삭제)
+        commit_message (str): 커밋 메시지
+    """
+    try:
+        client = get_github_client()
+        
+        contents = build_data_packages(files)
+        if contents is None:
+            return False
+        
+        max_retries = 3
+        for attempt in range(max_retries):
+            try:
+                response = client.commit_files(contents, commit_message)
+                
+                if response.status_code == 200:
+                    for file_path in files:
+                        invalidate_github_cache(file_path)
+                    return True
+                else:
+                    st.warning(f"GitHub 저장 실패 (시도 {attempt + 1}/{max_retries}): {response.status_code}")
+                    
+            except requests.exceptions.RequestException as e:
+                st.warning(f"네트워크 오류 (시도 {attempt + 1}/{max_retries}): {str(e)}")
+                
+            if attempt < max_retries - 1:
+                time.sleep(2 ** attempt)  # 지수 백오프
+        
+        return False
+        
+    except Exception as e:
+        st.error(f"GitHub 저장 중 오류: {e}")
+        return False
+
+class GitHubClient:
+    """GitHub contents API 클라이언트 (keep-alive 세션 + 파일별 SHA 기억)"""
+    
+    def __init__(self, token, owner=REPO_OWNER, repo=REPO_NAME, branch="main", timeout=30):
+        self.owner = owner
+        self.repo = repo
+        self.branch = branch
+        self.timeout = timeout
+        self.session = requests.Session()
+        self.session.headers.update({"Authorization": f"token {token}"})
+        adapter = HTTPAdapter(pool_connections=len(DATA_FILES), pool_maxsize=len(DATA_FILES) * 2)
+        self.session.mount("https://", adapter)
+        # 파일 경로 → 마지막으로 확인한 blob SHA (None: 파일 없음)
+        self._shas = {}
+        # 브랜치의 마지막으로 확인한 (커밋 SHA, 트리 SHA)
+        self._head = None
+        self._lock = threading.Lock()
+    
+    def api_url(self, endpoint):
+        """저장소 API URL"""
+        return f"https://api.github.com/repos/{self.owner}/{self.repo}/{endpoint}"
+    
+    def contents_url(self, file_path):
+        """contents API URL"""
+        return self.api_url(f"contents/{file_path}")
+    
+    def _remember_sha(self, file_path, sha):
+        with self._lock:
+            self._shas[file_path] = sha
+    
+    def get_contents(self, file_path, etag=None):
+        """파일 조회 (etag가 있으면 조건부 요청) - 200/404 응답의 SHA 기억"""
+        headers = {"If-None-Match": etag} if etag else {}
+        response = self.session.get(self.contents_url(file_path), headers=headers, timeout=self.timeout)
+        if response.status_code == 200:
+            self._remember_sha(file_path, response.json().get("sha"))
+        elif response.status_code == 404:
+            self._remember_sha(file_path, None)
+        return response
+    
+    def get_blob(self, sha):
+        """blob 원본 조회 (contents API가 내용을 주지 않는 1MB 초과 파일용)"""
+        response = self.session.get(
+            self.api_url(f"git/blobs/{sha}"),
+            headers={"Accept": "application/vnd.github.raw"},
+            timeout=self.timeout,
+        )
+        response.raise_for_status()
+        return response.content.decode()
+    
+    def put_contents(self, file_path, content, commit_message):
+        """파일 저장 - 기억한 SHA로 PUT 한 번, 충돌(409/422)일 때만 SHA 재조회 후 재시도"""
+        with self._lock:
+            known = file_path in self._shas
+            sha = self._shas.get(file_path)
+        
+        response = self._put(file_path, content, commit_message, sha)
+        if response.status_code in (409, 422):
+            self.get_contents(file_path)
+            with self._lock:
+                refreshed_sha = self._shas.get(file_path)
+            if not known or refreshed_sha != sha:
+                response = self._put(file_path, content, commit_message, refreshed_sha)
+        
+        if response.status_code in (200, 201):
+            body = response.json()
+            self._remember_sha(file_path, body["content"]["sha"])
+            with self._lock:
+                self._head = (body["commit"]["sha"], body["commit"]["tree"]["sha"])
+        return response
+    
+    def _fetch_head(self):
+        """브랜치의 현재 (커밋 SHA, 트리 SHA) 조회"""
+        ref = self.session.get(self.api_url(f"git/ref/heads/{self.branch}"), timeout=self.timeout)
+        ref.raise_for_status()
+        commit_sha = ref.json()["object"]["sha"]
+        
+        commit = self.session.get(self.api_url(f"git/commits/{commit_sha}"), timeout=self.timeout)
+        commit.raise_for_status()
+        return commit_sha, commit.json()["tree"]["sha"]
+    
+    def commit_files(self, files, commit_message):
+        """여러 파일을 하나의 커밋으로 반영 (트리 → 커밋 → 브랜치 이동)
+        
+        Args:
+            files (dict): 파일 경로 → 파일 내용 문자열 (None이면 삭제)
+            commit_message (str): 커밋 메시지
+        
+        Returns:
+            requests.Response: 브랜치 이동(PATCH) 응답 - 200이면 성공
+        """
+        tree_entries = [
+            {"path": file_path, "mode": "100644", "type": "blob", "content": content}
+            if content is not None else
+            {"path": file_path, "mode": "100644", "type": "blob", "sha": None}
+            for file_path, content in files.items()
+        ]
+        
+        with self._lock:
+            head = self._head
+        
+        # 기억한 브랜치 위치가 오래됐으면(fast-forward 불가 422) 한 번만 다시 조회 후 재시도
+        for attempt in range(2):
+            if head is None:
+                head = self._fetch_head()
+            commit_sha, tree_sha = head
+            
+            tree = self.session.post(self.api_url("git/trees"), json={
+                "base_tree": tree_sha,
+                "tree": tree_entries
+            }, timeout=self.timeout)
+            tree.raise_for_status()
+            new_tree_sha = tree.json()["sha"]
+            
+            commit = self.session.post(self.api_url("git/commits"), json={
+                "message": commit_message,
+                "tree": new_tree_sha,
+                "parents": [commit_sha]
+            }, timeout=self.timeout)
+            commit.raise_for_status()
+            new_commit_sha = commit.json()["sha"]
+            
+            response = self.session.patch(self.api_url(f"git/refs/heads/{self.branch}"), json={
+                "sha": new_commit_sha
+            }, timeout=self.timeout)
+            
+            if response.status_code == 200:
+                with self._lock:
+                    self._head = (new_commit_sha, new_tree_sha)
+                    # 파일 SHA가 바뀌었으므로 다음 조회/저장 시 다시 확인
+                    for file_path in files:
+                        self._shas.pop(file_path, None)
+                return response
+            
+            if response.status_code != 422 or attempt == 1:
+                return response
+            head = None
+        
+        return response
+    
+    def _put(self, file_path, content, commit_message, sha):
+        payload = {
+            "message": commit_message,
+            "content": content,
+            "branch": self.branch
+        }
+        if sha:
+            payload["sha"] = sha
+        return self.session.put(self.contents_url(file_path), json=payload, timeout=self.timeout)
+
+@st.cache_resource
+def get_github_client():
+    """프로세스 공용 GitHub 클라이언트"""
+    return GitHubClient(st.secrets["github_token"])
+
+@st.cache_resource
+def get_github_cache():
+    """프로세스 공용 GitHub 로드 캐시 (파일 경로 → etag, 복호화 결과, 확인 시각)"""
+    return {"lock": threading.Lock(), "entries": {}}
+
+def invalidate_github_cache(file_path=None):
+    """GitHub 로드 캐시 무효화 (file_path가 없으면 전체)"""
+    cache = get_github_cache()
+    with cache["lock"]:
+        if file_path is None:
+            cache["entries"].clear()
+        else:
+            cache["entries"].pop(file_path, None)
+
+def _store_github_cache(file_path, etag, results, last_update):
+    """GitHub 로드 결과를 캐시에 저장"""
+    cache = get_github_cache()
+    with cache["lock"]:
+        cache["entries"][file_path] = {
+            "etag": etag,
+            "results": results,
+            "last_update": last_update,
+            "checked_at": time.monotonic(),
+        }
+
+def _cached_github_result(entry):
+    """캐시 항목 반환 (호출 측 수정이 캐시에 반영되지 않도록 복사)"""
+    return copy.deepcopy(entry["results"]), entry["last_update"]
+
+def load_from_github(file_path):
+    """GitHub에서 암호화된 데이터 불러오기 (공통 함수) - 캐시 + ETag 재검증
+    
+    Returns:
+        tuple: (결과, 저장 시각) - 파일이 없으면 ({}, None)
+    
+    Raises:
+        StorageLoadError: 재시도 후에도 읽지 못한 경우
+    """
+    cache = get_github_cache()
+    with cache["lock"]:
+        entry = cache["entries"].get(file_path)
+    
+    # TTL 이내면 요청 없이 캐시 사용
+    if entry and time.monotonic() - entry["checked_at"] < GITHUB_CACHE_TTL:
+        return _cached_github_result(entry)
+    
+    max_retries = 3
+    error = None
+    
+    for attempt in range(max_retries):
+        try:
+            etag = entry["etag"] if entry else None
+            response = get_github_client().get_contents(file_path, etag)
+            
+            if response.status_code == 304 and entry:
+                # 변경 없음 - 다운로드/복호화 생략
+                _store_github_cache(file_path, entry["etag"], entry["results"], entry["last_update"])
+                return _cached_github_result(entry)
+            
+            if response.status_code == 200:
+                body = response.json()
+                if body.get("encoding") == "none":
+                    # 1MB 넘는 파일은 contents API가 내용을 비워서 주므로 blob으로 다시 조회
+                    package_text = get_github_client().get_blob(body["sha"])
+                else:
+                    package_text = base64.b64decode(body["content"]).decode()
+                results, last_update = parse_data_package(package_text)
+                if results:
+                    _store_github_cache(file_path, response.headers.get("ETag"), results, last_update)
+                return copy.deepcopy(results), last_update
+                    
+            elif response.status_code == 404:
+                # 파일이 없는 경우 - 정상적인 상황
+                _store_github_cache(file_path, None, {}, None)
+                return {}, None
+            else:
+                # 다른 에러의 경우
+                error = f"GitHub 데이터 로드 실패: {response.status_code}"
+                    
+        except requests.exceptions.RequestException as e:
+            error = f"네트워크 오류로 인한 데이터 로드 실패: {str(e)}"
+        except Exception as e:
+            error = f"GitHub 데이터 로드 중 오류: {str(e)}"
+        
+        if attempt < max_retries - 1:
+            time.sleep(1)  # 재시도 전 대기
+    
+    raise StorageLoadError(error)
+
+# 💾 저장소 백엔드 (secrets의 storage_backend로 선택)
+class StorageBackend(ABC):
+    """저장소 인터페이스 - 파일 경로 단위로 암호화 데이터 저장/로드"""
+    
+    name = ""
+    
+    @abstractmethod
+    def fetch(self, file_path):
+        """데이터 불러오기
+        
+        Returns:
+            tuple: (결과, 저장 시각) - 파일이 없으면 ({}, None)
+        
+        Raises:
+            StorageLoadError: 파일은 있을 수 있지만 읽지 못한 경우
+        """
+    
+    def load(self, file_path):
+        """데이터 불러오기 (화면 표시용 - 읽지 못하면 관리자에게 알리고 빈 데이터)"""
+        try:
+            return self.fetch(file_path)
+        except StorageLoadError as e:
+            if st.session_state.get('admin_mode', False):
+                st.error(f"데이터 로드 실패 ({file_path}): {e}")
+            return {}, None
+    
+    @abstractmethod
+    def save_many(self, files, commit_message):
+        """여러 파일 저장 (files: 파일 경로 → 데이터, None이면 삭제) - 성공 여부 반환"""
+    
+    def save(self, data, file_path, commit_message):
+        """파일 하나 저장"""
+        return self.save_many({file_path: data}, commit_message)
+    
+    def delete(self, file_path, commit_message):
+        """파일 삭제"""
+        return self.save_many({file_path: None}, commit_message)
+
+class GitHubBackend(StorageBackend):
+    """GitHub 저장소 (contents API 로드/저장, 여러 파일은 한 커밋)"""
+    
+    name = "github"
+    
+    def fetch(self, file_path):
+        return load_from_github(file_path)
+    
+    def save(self, data, file_path, commit_message):
+        if data is None:
+            return self.delete(file_path, commit_message)
+        return save_to_github(data, file_path, commit_message)
+    
+    def save_many(self, files, commit_message):
+        return save_many_to_github(files, commit_message)
+
+class LocalFileBackend(StorageBackend):
+    """로컬 암호화 파일 저장소 (GitHub 저장소와 같은 경로 구조, 파일 단위 원자적 교체)"""
+    
+    name = "local"
+    
+    def __init__(self, root=DEFAULT_LOCAL_STORAGE_DIR):
+        self.root = root
+    
+    def _path(self, file_path):
+        return os.path.join(self.root, file_path)
+    
+    def fetch(self, file_path):
+        try:
+            with open(self._path(file_path), encoding="utf-8") as f:
+                package_text = f.read()
+        except FileNotFoundError:
+            return {}, None
+        except OSError as e:
+            raise StorageLoadError(f"로컬 데이터 로드 중 오류: {e}") from e
+        return parse_data_package(package_text)
+    
+    def save_many(self, files, commit_message):
+        packages = build_data_packages(files)
+        if packages is None:
+            return False
+        
+        try:
+            for file_path, package_text in packages.items():
+                path = self._path(file_path)
+                if package_text is None:
+                    if os.path.exists(path):
+                        os.remove(path)
+                    continue
+                
+                # 임시 파일에 쓴 뒤 교체 (쓰다 만 파일을 읽지 않도록)
+                directory = os.path.dirname(path)
+                os.makedirs(directory, exist_ok=True)
+                fd, tmp_path = tempfile.mkstemp(dir=directory, suffix=".tmp")
+                try:
+                    with os.fdopen(fd, "w", encoding="utf-8") as f:
+                        f.write(package_text)
+                    os.replace(tmp_path, path)
+                except BaseException:
+                    os.unlink(tmp_path)
+                    raise
+            return True
+        except OSError as e:
+            st.error(f"로컬 저장 중 오류: {e}")
+            return False
+
+class SQLiteBackend(StorageBackend):
+    """SQLite 저장소 (파일 경로별 한 행, 여러 파일은 한 트랜잭션)"""
+    
+    name = "sqlite"
+    
+    def __init__(self, db_path=DEFAULT_SQLITE_PATH):
+        self.db_path = db_path
+        os.makedirs(os.path.dirname(os.path.abspath(db_path)), exist_ok=True)
+        conn = self._connect()
+        try:
+            with conn:
+                conn.execute(
+                    "CREATE TABLE IF NOT EXISTS storage_files ("
+                    "path TEXT PRIMARY KEY, package TEXT NOT NULL, updated_at TEXT NOT NULL)"
+                )
+        finally:
+            conn.close()
+    
+    def _connect(self):
+        # 호출마다 별도 연결 (동시 로드 스레드에서 연결 공유하지 않음)
+        return sqlite3.connect(self.db_path, timeout=30)
+    
+    def fetch(self, file_path):
+        try:
+            conn = self._connect()
+            try:
+                row = conn.execute("SELECT package FROM storage_files WHERE path = ?", (file_path,)).fetchone()
+            finally:
+                conn.close()
+        except sqlite3.Error as e:
+            raise StorageLoadError(f"SQLite 데이터 로드 중 오류: {e}") from e
+        if row is None:
+            return {}, None
+        return parse_data_package(row[0])
+    
+    def save_many(self, files, commit_message):
+        packages = build_data_packages(files)
+        if packages is None:
+            return False
+        
+        updated_at = datetime.now(KST).isoformat()
+        try:
+            conn = self._connect()
+            try:
+                with conn:
+                    for file_path, package_text in packages.items():
+                        if package_text is None:
+                            conn.execute("DELETE FROM storage_files WHERE path = ?", (file_path,))
+                        else:
+                            conn.execute(
+                                "INSERT OR REPLACE INTO storage_files (path, package, updated_at) VALUES (?, ?, ?)",
+                                (file_path, package_text, updated_at)
+                            )
+            finally:
+                conn.close()
+            return True
+        except sqlite3.Error as e:
+            st.error(f"SQLite 저장 중 오류: {e}")
+            return False
+
+STORAGE_BACKENDS = {
+    GitHubBackend.name: GitHubBackend,
+    LocalFileBackend.name: LocalFileBackend,
+    SQLiteBackend.name: SQLiteBackend,
+}
+
+@st.cache_resource
+def get_storage_backend():
+    """secrets 설정에 따른 저장소 백엔드 (storage_backend: github | local | sqlite, storage_path: 로컬 위치)"""
+    name = st.secrets.get("storage_backend", DEFAULT_STORAGE_BACKEND)
+    if name not in STORAGE_BACKENDS:
+        raise ValueError(f"알 수 없는 storage_backend: {name} (가능: {', '.join(STORAGE_BACKENDS)})")
+    
+    storage_path = st.secrets.get("storage_path")
+    if name == GitHubBackend.name or not storage_path:
+        return STORAGE_BACKENDS[name]()
+    return STORAGE_BACKENDS[name](storage_path)
+
+def save_shipment_data(results):
+    """출고 현황 데이터 저장"""
+    commit_message = f"출고 현황 업데이트 - {datetime.now(KST).strftime('%Y-%m-%d %H:%M')}"
+    return get_storage_backend().save(results, SHIPMENT_FILE_PATH, commit_message)
+
+def load_shipment_data():
+    """출고 현황 데이터 불러오기"""
+    return get_storage_backend().load(SHIPMENT_FILE_PATH)
+
+def save_box_data(box_results):
+    """박스 계산 데이터 저장"""
+    commit_message = f"박스 계산 결과 업데이트 - {datetime.now(KST).strftime('%Y-%m-%d %H:%M')}"
+    return get_storage_backend().save(box_results, BOX_FILE_PATH, commit_message)
+
+def save_upload_results(results, box_results, upload_index=None):
+    """업로드 결과(출고 현황 + 박스 계산 + 업로드 색인)를 함께 저장 (GitHub: 한 커밋, SQLite: 한 트랜잭션)"""
+    files = {}
+    if results:
+        files[SHIPMENT_FILE_PATH] = results
+    if box_results:
+        files[BOX_FILE_PATH] = box_results
+    if not files:
+        return False
+    if upload_index:
+        files[UPLOAD_INDEX_FILE_PATH] = upload_index
+    
+    commit_message = f"출고 현황 · 박스 계산 업데이트 - {datetime.now(KST).strftime('%Y-%m-%d %H:%M')}"
+    return get_storage_backend().save_many(files, commit_message)
+
+def load_box_data():
+    """박스 계산 데이터 불러오기"""
+    return get_storage_backend().load(BOX_FILE_PATH)
+
+def save_stock_data(stock_results):
+    """재고 현황 데이터 저장"""
+    commit_message = f"재고 현황 업데이트 - {datetime.now(KST).strftime('%Y-%m-%d %H:%M')}"
+    return get_storage_backend().save(stock_results, STOCK_FILE_PATH, commit_message)
+
+def load_stock_data():
+    """재고 현황 데이터 불러오기"""
+    return get_storage_backend().load(STOCK_FILE_PATH)
+
+def get_stock_history_path(month):
+    """월별 재고 이력 파일 경로 (month: YYYY-MM)"""
+    return STOCK_HISTORY_PATH_TEMPLATE.format(month=month)
+
+def get_entry_month(entry):
+    """재고 입력 항목의 월 (YYYY-MM)"""
+    return entry["입력일시"][:7]
+
+def replay_stock_history(records):
+    """이력 기록(스냅샷/변경분) → 재고 입력 항목 목록 (시간순)"""
+    entries = []
+    stock = {}
+    for record in records:
+        if "스냅샷" in record:
+            stock = dict(record["스냅샷"])
+        else:
+            stock = dict(stock)
+            stock.update(record.get("변경", {}))
+            for key in record.get("삭제", []):
+                stock.pop(key, None)
+        entries.append({
+            "입력일시": record["입력일시"],
+            "입력용": stock,
+            "출고반영": record.get("출고반영", False)
+        })
+    return entries
+
+def build_stock_history_record(entry, previous_stock, records_since_snapshot):
+    """재고 입력 항목 → 이력 기록 (첫 기록과 STOCK_SNAPSHOT_INTERVAL마다 스냅샷, 나머지는 변경분)"""
+    record = {"입력일시": entry["입력일시"], "출고반영": entry.get("출고반영", False)}
+    current_stock = entry["입력용"]
+    
+    if previous_stock is None or records_since_snapshot >= STOCK_SNAPSHOT_INTERVAL:
+        record["스냅샷"] = dict(current_stock)
+        return record
+    
+    record["변경"] = {key: qty for key, qty in current_stock.items() if previous_stock.get(key) != qty}
+    removed = [key for key in previous_stock if key not in current_stock]
+    if removed:
+        record["삭제"] = removed
+    return record
+
+def add_stock_history_entries(partitions, entries, partition_key=get_entry_month):
+    """시간순 재고 입력 항목을 월별 이력 기록에 추가 (partitions: 월 → 기록 목록, 제자리 수정)"""
+    states = {}
+    for entry in entries:
+        month = partition_key(entry)
+        records = partitions.setdefault(month, [])
+        if month not in states:
+            replayed = replay_stock_history(records)
+            since_snapshot = next((i for i, record in enumerate(reversed(records)) if "스냅샷" in record), len(records) - 1) + 1
+            states[month] = (replayed[-1]["입력용"] if replayed else None, since_snapshot)
+        
+        previous_stock, since_snapshot = states[month]
+        record = build_stock_history_record(entry, previous_stock, since_snapshot)
+        records.append(record)
+        states[month] = (entry["입력용"], 1 if "스냅샷" in record else since_snapshot + 1)
+
+def save_stock_entry(current_stock, new_entry, commit_message):
+    """재고 입력 저장 - 최근 재고 파일과 해당 월 이력 파일만 함께 저장
+    
+    기존 단일 목록 이력("이력")이 있으면 이번 저장 때 월별 이력 파일로 옮깁니다.
+    """
+    backend = get_storage_backend()
+    
+    # 기존 이력은 최신순 목록 → 시간순으로 변환
+    legacy_entries = list(reversed(current_stock.get("이력", [])))
+    
+    # 읽지 못한 달을 빈 달로 보고 덮어쓰지 않도록, 하나라도 읽지 못하면 저장하지 않음
+    partitions = {}
+    try:
+        for month in sorted({get_entry_month(entry) for entry in legacy_entries + [new_entry]}):
+            partition_data, _ = backend.fetch(get_stock_history_path(month))
+            partitions[month] = partition_data.get("기록", [])
+    except StorageLoadError as e:
+        st.error(f"재고 이력을 불러오지 못해 저장하지 않았습니다: {e}")
+        return False
+    
+    # 이미 옮겨진 기록은 다시 추가하지 않음 (중간에 실패한 이전 이동 대비)
+    legacy_entries = [
+        entry for entry in legacy_entries
+        if not partitions[get_entry_month(entry)] or entry["입력일시"] > partitions[get_entry_month(entry)][-1]["입력일시"]
+    ]
+    add_stock_history_entries(partitions, legacy_entries + [new_entry])
+    
+    stock_data = {key: value for key, value in current_stock.items() if key != "이력"}
+    stock_data["최근입력"] = new_entry
+    stock_data["이력파티션"] = sorted(set(stock_data.get("이력파티션", [])) | set(partitions))
+    
+    # 이력 파일을 먼저, 최근 재고 파일을 마지막에 저장
+    files = {get_stock_history_path(month): {"기록": records} for month, records in partitions.items()}
+    files[STOCK_FILE_PATH] = stock_data
+    return backend.save_many(files, commit_message)
+
+def parse_entry_time(entry):
+    """재고 입력 항목의 입력일시 (한국 시간, 시간대 없는 datetime)"""
+    dt = datetime.fromisoformat(entry["입력일시"].replace('Z', '+00:00'))
+    return dt.astimezone(KST).replace(tzinfo=None) if dt.tzinfo else dt
+
+def rollup_stock_entries(entries, period_key):
+    """기간별 마지막 입력만 남김 (entries: 시간순, 결과도 시간순)"""
+    latest = {}
+    for entry in entries:
+        latest[period_key(entry)] = entry
+    return list(latest.values())
+
+def get_stock_retention():
+    """재고 이력 보존 정책 (기본값 + secrets의 stock_retention)"""
+    retention = dict(STOCK_RETENTION)
+    retention.update(st.secrets.get("stock_retention", {}))
+    return retention
+
+def compact_stock_history(now=None):
+    """재고 이력 정리 - 보존 정책에 따라 월별 이력을 줄이고 오래된 입력은 보관 파일로 이동
+    
+    Returns:
+        dict: before(정리 전 입력 수), kept(월별 이력에 남은 수), archived(이번에 보관한 수),
+              archive_total(보관 파일 입력 수), saved(저장 성공 여부, 정리할 것이 없으면 None)
+              - 재고 데이터가 없으면 None
+    
+    Raises:
+        StorageLoadError: 재고/월별 이력/보관 파일 중 하나라도 읽지 못한 경우 (아무것도 저장하지 않음)
+    """
+    backend = get_storage_backend()
+    retention = get_stock_retention()
+    now = now or datetime.now(KST).replace(tzinfo=None)
+    full_since = now - timedelta(days=retention["full_days"])
+    daily_since = now - timedelta(days=retention["daily_days"])
+    
+    stock_data, _ = backend.fetch(STOCK_FILE_PATH)
+    if not stock_data:
+        return None
+    
+    # 전체 이력 복원 (아직 옮겨지지 않은 기존 목록 이력 포함)
+    months = stock_data.get("이력파티션", [])
+    entries = list(reversed(stock_data.get("이력", [])))
+    for month in months:
+        partition_data, _ = backend.fetch(get_stock_history_path(month))
+        entries += replay_stock_history(partition_data.get("기록", []))
+    entries.sort(key=parse_entry_time)
+    
+    recent_entries = [entry for entry in entries if parse_entry_time(entry) >= full_since]
+    daily_entries = [entry for entry in entries if daily_since <= parse_entry_time(entry) < full_since]
+    old_entries = [entry for entry in entries if parse_entry_time(entry) < daily_since]
+    
+    kept_entries = rollup_stock_entries(daily_entries, lambda entry: parse_entry_time(entry).date()) + recent_entries
+    summary = {
+        "before": len(entries),
+        "kept": len(kept_entries),
+        "archived": len(old_entries),
+        "archive_total": 0,
+        "saved": None
+    }
+    
+    if len(kept_entries) == len(entries) and "이력" not in stock_data:
+        return summary
+    
+    partitions = {}
+    add_stock_history_entries(partitions, kept_entries)
+    files = {
+        get_stock_history_path(month): {"기록": partitions[month]} if month in partitions else None
+        for month in sorted(set(months) | set(partitions))
+    }
+    
+    if old_entries:
+        archive_data, _ = backend.fetch(STOCK_ARCHIVE_PATH)
+        archived_entries = replay_stock_history(archive_data.get("기록", [])) + old_entries
+        archived_entries = rollup_stock_entries(
+            sorted(archived_entries, key=parse_entry_time),
+            lambda entry: parse_entry_time(entry).isocalendar()[:2]
+        )
+        archive = {}
+        add_stock_history_entries(archive, archived_entries, partition_key=lambda entry: "보관")
+        files[STOCK_ARCHIVE_PATH] = {"기록": archive["보관"]}
+        summary["archive_total"] = len(archived_entries)
+    
+    stock_data = {key: value for key, value in stock_data.items() if key != "이력"}
+    stock_data["이력파티션"] = sorted(partitions)
+    files[STOCK_FILE_PATH] = stock_data
+    
+    commit_message = f"재고 이력 정리 - {datetime.now(KST).strftime('%Y-%m-%d %H:%M')}"
+    summary["saved"] = backend.save_many(files, commit_message)
+    return summary
+
+def format_compaction_summary(summary):
+    """재고 이력 정리 결과 문구"""
+    if summary is None:
+        return "재고 데이터가 없습니다."
+    if summary["saved"] is None:
+        return f"정리할 이력이 없습니다. (입력 {summary['before']}건)"
+    return (
+        f"입력 {summary['before']}건 → 월별 이력 {summary['kept']}건, "
+        f"보관 이동 {summary['archived']}건 (보관 파일 {summary['archive_total']}건)"
+    )
+
+def load_all_data(names=tuple(DATA_FILES)):
+    """출고/박스/재고 데이터 동시 로드
+    
+    Args:
+        names: 불러올 데이터 키 (DATA_FILES 키 중)
+    
+    Returns:
+        dict: {키: (results, last_update)}
+    """
+    backend = get_storage_backend()
+    
+    # 작업 스레드에서도 st.secrets / session_state를 쓸 수 있도록 실행 컨텍스트 연결
+    ctx = get_script_run_ctx()
+    with ThreadPoolExecutor(
+        max_workers=max(len(names), 1),
+        initializer=lambda: add_script_run_ctx(threading.current_thread(), ctx),
+    ) as executor:
+        futures = {name: executor.submit(backend.load, DATA_FILES[name]) for name in names}
+        return {name: future.result() for name, future in futures.items()}
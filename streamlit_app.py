@@ -1,51 +1,83 @@
 import streamlit as st
 import pandas as pd
-from collections import defaultdict
-import re
-from datetime import datetime, timezone, timedelta
+import numpy as np
+from collections import defaultdict, namedtuple
+from datetime import datetime
 import io
 import plotly.express as px
 import plotly.graph_objects as go
 import json
+import html
 import base64
-import requests
-from cryptography.fernet import Fernet
+import openpyxl
 import gc
+import math
+import functools
+import hashlib
+import binascii
 import time
 import random
 from datetime import datetime
 import time
 
 # ✅ product_mapping 모듈 import 추가
-from product_mapping import get_product_info, get_mapping_stats
+from product_mapping import get_product_info_many, get_mapping_stats, MAPPING_VERSION
+from storage import (
+    KST, load_all_data, load_shipment_data,
+    save_upload_results, save_stock_entry, get_stock_retention,
+    compact_stock_history, format_compaction_summary, StorageLoadError
+)
+from product_catalog import (
+    CATALOG_PRODUCTS, CATALOG_VERSION, get_sku, get_sku_by_input_key,
+    standardize_capacity_for_display, standardize_capacity_for_box
+)
 
-# 한국 시간대 설정
-KST = timezone(timedelta(hours=9))
+# 화면별로 불러오는 데이터 (화면 이름 → DATA_FILES 키)
+VIEW_DATA = {
+    "📦 출고 현황": ("shipment",),
+    "📦 박스 계산": ("box",),
+    "📊 재고 관리": ("stock", "shipment"),
+}
 
-# GitHub 설정 - 수정된 저장소명
-REPO_OWNER = "coder4052"  # 본인 GitHub 사용자명으로 변경하세요
-REPO_NAME = "seroe"  # 실제 생성한 저장소명
-SHIPMENT_FILE_PATH = "data/출고현황_encrypted.json"
-BOX_FILE_PATH = "data/박스계산_encrypted.json"
-STOCK_FILE_PATH = "data/재고현황_encrypted.json"
+# 파일 업로드 시 불러오는 이전 업로드 데이터 (변경분만 반영할 때 기준)
+UPLOAD_BASE_DATA = ("shipment", "box", "upload_index")
 
 # ✅ 새로 추가: 컬럼 매핑 테이블
-def detect_and_standardize_columns(df):
-    """새로운 엑셀 양식의 컬럼명을 표준화"""
-    rename_dict = {
-        '노출상품명(옵션명)': '상품이름',
-        '등록옵션명': '옵션이름',
-        '구매수(수량)': '상품수량',
-        '구매자': '주문자이름',
-        '구매자전화번호': '주문자전화번호1'
-    }
-    
-    detected = [f"{v} ← {k}" for k, v in rename_dict.items() if k in df.columns]
+COLUMN_RENAME_MAP = {
+    '노출상품명(옵션명)': '상품이름',
+    '등록옵션명': '옵션이름',
+    '구매수(수량)': '상품수량',
+    '구매자': '주문자이름',
+    '구매자전화번호': '주문자전화번호1'
+}
+
+# 🔒 민감정보 제거 후 남기는 컬럼 / 필수 컬럼
+SAFE_COLUMNS = ['상품이름', '옵션이름', '상품수량', '수취인이름', '주문자이름', '주문자전화번호1']
+ESSENTIAL_COLUMNS = ['상품이름', '옵션이름', '상품수량']
+
+def report_detected_columns(columns):
+    """새로운 엑셀 양식 컬럼 감지 결과 표시"""
+    detected = [f"{v} ← {k}" for k, v in COLUMN_RENAME_MAP.items() if k in columns]
     if detected:
         st.success("✅ **새로운 엑셀 양식 감지!**")
         st.info("📋 **매핑**: " + " | ".join(detected))
-    
-    return df.rename(columns=rename_dict)
+
+def detect_and_standardize_columns(df):
+    """새로운 엑셀 양식의 컬럼명을 표준화"""
+    report_detected_columns(df.columns)
+    return df.rename(columns=COLUMN_RENAME_MAP)
+
+def check_essential_columns(columns):
+    """필수 컬럼 확인 - 없으면 안내 메시지 표시 후 False"""
+    missing_columns = [col for col in ESSENTIAL_COLUMNS if col not in columns]
+    if missing_columns:
+        st.error(f"❌ 필수 컬럼이 없습니다: {missing_columns}")
+        st.info("💡 새로운 엑셀 양식 컬럼을 확인하세요:")
+        st.info("   - M열: 노출상품명(옵션명)")
+        st.info("   - L열: 등록옵션명") 
+        st.info("   - W열: 구매수(수량)")
+        return False
+    return True
 
 
 
@@ -196,14 +228,14 @@ h3 {
     padding: 2rem;
 }
 
-/* 탭 버튼 크기 및 스타일 개선 */
-.stTabs [data-baseweb="tab-list"] {
+/* 화면 선택 버튼 크기 및 스타일 개선 */
+.stRadio [role="radiogroup"] {
     gap: 15px !important;
     margin-bottom: 25px !important;
     padding: 10px 0 !important;
 }
 
-.stTabs [data-baseweb="tab-list"] button {
+.stRadio [role="radiogroup"] label {
     font-size: 20px !important;
     font-weight: 700 !important;
     padding: 18px 30px !important;
@@ -215,18 +247,30 @@ h3 {
     transition: all 0.2s ease !important;
     background-color: #ffffff !important;
     color: #666666 !important;
+    justify-content: center !important;
+}
+
+/* 라디오 동그라미 숨김 (버튼처럼 표시) */
+.stRadio [role="radiogroup"] label > div:first-child {
+    display: none !important;
+}
+
+.stRadio [role="radiogroup"] label p {
+    font-size: 20px !important;
+    font-weight: inherit !important;
+    color: inherit !important;
 }
 
-/* 탭 버튼 hover 효과 */
-.stTabs [data-baseweb="tab-list"] button:hover {
+/* 화면 선택 버튼 hover 효과 */
+.stRadio [role="radiogroup"] label:hover {
     background-color: #f5f5f5 !important;
     color: #1f77b4 !important;
     border-color: #1f77b4 !important;
     transform: translateY(-1px) !important;
 }
 
-/* 활성 탭 스타일 */
-.stTabs [data-baseweb="tab-list"] button[aria-selected="true"] {
+/* 선택된 화면 스타일 */
+.stRadio [role="radiogroup"] label:has(input:checked) {
     background-color: #1f77b4 !important;
     color: white !important;
     font-weight: 800 !important;
@@ -235,7 +279,7 @@ h3 {
 </style>
 """, unsafe_allow_html=True)
 
-# 새로운 박스 단순 규칙
+# 새로운 박스 단순 규칙 (박스별 용량 수량 범위 - 박스 사양 변경 시 이 표만 수정)
 BOX_RULES = {
     "박스 A": {"1L": (1, 2), "500ml": (1, 3), "240ml": (1, 5)},
     "박스 B": {"1L": (3, 4), "500ml": (4, 6), "240ml": (6, 10)},
@@ -255,199 +299,77 @@ BOX_COST_ORDER = {
     "박스 F": 6
 }
 
-# 🚨 재고 부족 임계값 설정 (새로 추가)
-STOCK_THRESHOLDS = {
-    "단호박식혜 1.5L": 10,
-    "단호박식혜 1L": 20,
-    "단호박식혜 240ml": 50,
-    "식혜 1.5L": 20,
-    "식혜 1L": 10,
-    "식혜 240ml": 50,
-    "수정과 500ml": 50,
-    "플레인 쌀요거트 1L": 20,
-    "플레인 쌀요거트 200ml": 10,
-    "밥알없는 단호박식혜 1.5L": 1,
-    "밥알없는 단호박식혜 1L": 1,
-    "밥알없는 단호박식혜 240ml": 1,
-    "밥알없는 식혜 1.5L": 1,
-    "밥알없는 식혜 1L": 1,
-    "밥알없는 식혜 240ml": 1,
+# 박스 규칙에 맞지 않는 주문 (혼합 용량 또는 범위 밖 수량)
+REVIEW_BOX = "검토 필요"
+
+# 한 박스에 담을 수 있는 용량 종류 수 (초과하면 검토 필요)
+MAX_CAPACITIES_PER_BOX = 1
+
+# 박스 계산 용량 (수취인 × 용량 수량 행렬의 열 순서, 200ml는 240ml로 합산)
+BOX_CAPACITIES = ['1.5L', '1L', '500ml', '240ml']
+BOX_CAPACITY_INDEX = {capacity: i for i, capacity in enumerate(BOX_CAPACITIES)}
+
+# 주문 수량 행렬 자료형
+ORDER_QUANTITY_DTYPE = np.int32
+
+# 박스 규칙 범위표 (박스, 용량, 최소, 최대) - 비용이 낮은 박스부터 평가
+BOX_RULE_TABLE = pd.DataFrame(
+    [
+        (box_name, capacity, low, high)
+        for box_name, capacities in sorted(BOX_RULES.items(), key=lambda x: BOX_COST_ORDER.get(x[0], 999))
+        for capacity, (low, high) in capacities.items()
+    ],
+    columns=['박스', '용량', '최소', '최대']
+)
+
+# 🧩 혼합 주문 포장 설정
+# 박스별 용량 최대 수량을 적재 한도로 사용 (한 박스에 여러 용량을 섞으면 차지 비율의 합이 1 이하)
+PACKING_OBJECTIVE = "boxes"  # "boxes": 박스 수 최소 (동률이면 비용) / "cost": 박스 비용 최소
+PACKING_MAX_BOTTLES = 30  # 이보다 많은 주문은 계산하지 않고 검토 필요로 분류
+
+# 박스 설명 (박스 규칙에서 생성)
+BOX_DESCRIPTIONS = {
+    box_name: ", ".join(
+        f"{capacity} {low}개" if low == high else f"{capacity} {low}~{high}개"
+        for capacity, (low, high) in capacities.items()
+    )
+    for box_name, capacities in BOX_RULES.items()
+}
+
+# 🔁 재업로드 변경분 반영 - 마지막 업로드의 행 지문 색인 (개인정보 대신 키 기반 해시만 저장)
+UPLOAD_INDEX_FORMAT = 1
+
+# 색인 열 → 자료형 (지문별 한 행, 이진 배열로 저장)
+# fingerprint: 행 지문 / count: 같은 행 수 / shipment_key, box_key: 제품 키 코드 / quantity: 행 하나의 총수량 / recipient: 수취인 토큰
+UPLOAD_INDEX_COLUMNS = {
+    "fingerprint": np.uint64,
+    "count": np.int64,
+    "shipment_key": np.int32,
+    "box_key": np.int32,
+    "quantity": np.int64,
+    "recipient": np.uint64,
 }
 
+# 매핑 규칙, 용량 정규화 규칙이나 박스 규칙이 바뀌면 이전 색인의 행 기여분을 쓸 수 없으므로 전체 다시 처리
+UPLOAD_INDEX_SIGNATURE = hashlib.sha256(repr((
+    MAPPING_VERSION, CATALOG_VERSION, BOX_RULES, BOX_COST_ORDER, MAX_CAPACITIES_PER_BOX,
+    BOX_CAPACITIES, PACKING_OBJECTIVE, PACKING_MAX_BOTTLES
+)).encode()).hexdigest()[:12]
+
 # 🔒 보안 함수들
 def sanitize_data(df):
     """민감정보 완전 제거 - 새로운 엑셀 양식 전용"""
     df = detect_and_standardize_columns(df)
     
-    safe_columns = ['상품이름', '옵션이름', '상품수량', '수취인이름', '주문자이름', '주문자전화번호1']
-    available_columns = df.columns.intersection(safe_columns)
+    available_columns = df.columns.intersection(SAFE_COLUMNS)
     sanitized_df = df[available_columns].copy()
     
-    essential_columns = ['상품이름', '옵션이름', '상품수량']
-    missing_columns = [col for col in essential_columns if col not in sanitized_df.columns]
-    if missing_columns:
-        st.error(f"❌ 필수 컬럼이 없습니다: {missing_columns}")
-        st.info("💡 새로운 엑셀 양식 컬럼을 확인하세요:")
-        st.info("   - M열: 노출상품명(옵션명)")
-        st.info("   - L열: 등록옵션명") 
-        st.info("   - W열: 구매수(수량)")
+    if not check_essential_columns(sanitized_df.columns):
         return pd.DataFrame()
     
     st.success(f"✅ 새로운 양식 처리 완료: {list(available_columns)}")
     return sanitized_df
 
-def encrypt_results(results):
-    """집계 결과 암호화"""
-    try:
-        key = st.secrets["encryption_key"]
-        f = Fernet(key.encode())
-        
-        json_str = json.dumps(results, ensure_ascii=False)
-        encrypted_data = f.encrypt(json_str.encode())
-        return base64.b64encode(encrypted_data).decode()
-    except Exception as e:
-        st.error(f"암호화 중 오류: {e}")
-        return None
-
-def decrypt_results(encrypted_data):
-    """암호화된 결과 복호화"""
-    try:
-        key = st.secrets["encryption_key"]
-        f = Fernet(key.encode())
-        
-        decoded_data = base64.b64decode(encrypted_data.encode())
-        decrypted_data = f.decrypt(decoded_data)
-        return json.loads(decrypted_data.decode())
-    except Exception as e:
-        st.error(f"복호화 중 오류: {e}")
-        return {}
-
-def save_to_github(data, file_path, commit_message):
-    """GitHub에 암호화된 데이터 저장 (공통 함수)"""
-    try:
-        github_token = st.secrets["github_token"]
-        url = f"https://api.github.com/repos/{REPO_OWNER}/{REPO_NAME}/contents/{file_path}"
-        
-        encrypted_data = encrypt_results(data)
-        if not encrypted_data:
-            return False
-        
-        data_package = {
-            'encrypted_data': encrypted_data,
-            'last_update': datetime.now(KST).isoformat(),
-            'timestamp': datetime.now(KST).timestamp()
-        }
-        
-        headers = {"Authorization": f"token {github_token}"}
-        
-        # 재시도 로직 추가
-        max_retries = 3
-        for attempt in range(max_retries):
-            try:
-                response = requests.get(url, headers=headers, timeout=30)
-                sha = response.json().get("sha") if response.status_code == 200 else None
-                
-                content = base64.b64encode(json.dumps(data_package, ensure_ascii=False, indent=2).encode()).decode()
-                
-                payload = {
-                    "message": commit_message,
-                    "content": content,
-                    "branch": "main"
-                }
-                
-                if sha:
-                    payload["sha"] = sha
-                
-                response = requests.put(url, headers=headers, json=payload, timeout=30)
-                
-                if response.status_code in [200, 201]:
-                    return True
-                else:
-                    st.warning(f"GitHub 저장 실패 (시도 {attempt + 1}/{max_retries}): {response.status_code}")
-                    
-            except requests.exceptions.RequestException as e:
-                st.warning(f"네트워크 오류 (시도 {attempt + 1}/{max_retries}): {str(e)}")
-                
-            if attempt < max_retries - 1:
-                time.sleep(2 ** attempt)  # 지수 백오프
-        
-        return False
-        
-    except Exception as e:
-        st.error(f"GitHub 저장 중 오류: {e}")
-        return False
-
-def load_from_github(file_path):
-    """GitHub에서 암호화된 데이터 불러오기 (공통 함수) - 개선된 에러 처리"""
-    max_retries = 3
-    
-    for attempt in range(max_retries):
-        try:
-            github_token = st.secrets["github_token"]
-            url = f"https://api.github.com/repos/{REPO_OWNER}/{REPO_NAME}/contents/{file_path}"
-            
-            headers = {"Authorization": f"token {github_token}"}
-            response = requests.get(url, headers=headers, timeout=30)
-            
-            if response.status_code == 200:
-                content = response.json()["content"]
-                decoded_content = base64.b64decode(content).decode()
-                data = json.loads(decoded_content)
-                
-                encrypted_results = data.get('encrypted_data')
-                if encrypted_results:
-                    results = decrypt_results(encrypted_results)
-                    last_update_str = data.get('last_update')
-                    last_update = datetime.fromisoformat(last_update_str) if last_update_str else None
-                    return results, last_update
-                    
-            elif response.status_code == 404:
-                # 파일이 없는 경우 - 정상적인 상황
-                return {}, None
-            else:
-                # 다른 에러의 경우
-                if attempt == max_retries - 1 and st.session_state.get('admin_mode', False):
-                    st.warning(f"GitHub 데이터 로드 실패: {response.status_code}")
-                    
-        except requests.exceptions.RequestException as e:
-            if attempt == max_retries - 1 and st.session_state.get('admin_mode', False):
-                st.warning(f"네트워크 오류로 인한 데이터 로드 실패: {str(e)}")
-        except Exception as e:
-            if attempt == max_retries - 1 and st.session_state.get('admin_mode', False):
-                st.error(f"GitHub 데이터 로드 중 오류: {str(e)}")
-        
-        if attempt < max_retries - 1:
-            time.sleep(1)  # 재시도 전 대기
-    
-    return {}, None
-
-def save_shipment_data(results):
-    """출고 현황 데이터 저장"""
-    commit_message = f"출고 현황 업데이트 - {datetime.now(KST).strftime('%Y-%m-%d %H:%M')}"
-    return save_to_github(results, SHIPMENT_FILE_PATH, commit_message)
-
-def load_shipment_data():
-    """출고 현황 데이터 불러오기"""
-    return load_from_github(SHIPMENT_FILE_PATH)
-
-def save_box_data(box_results):
-    """박스 계산 데이터 저장"""
-    commit_message = f"박스 계산 결과 업데이트 - {datetime.now(KST).strftime('%Y-%m-%d %H:%M')}"
-    return save_to_github(box_results, BOX_FILE_PATH, commit_message)
-
-def load_box_data():
-    """박스 계산 데이터 불러오기"""
-    return load_from_github(BOX_FILE_PATH)
-
-def save_stock_data(stock_results):
-    """재고 현황 데이터 저장"""
-    commit_message = f"재고 현황 업데이트 - {datetime.now(KST).strftime('%Y-%m-%d %H:%M')}"
-    return save_to_github(stock_results, STOCK_FILE_PATH, commit_message)
-
-def load_stock_data():
-    """재고 현황 데이터 불러오기"""
-    return load_from_github(STOCK_FILE_PATH)
-
 def get_stock_product_keys():
     """재고 관리용 상품 키 목록 생성 (출고 현황과 동기화)"""
     shipment_results, _ = load_shipment_data()
@@ -518,6 +440,64 @@ def check_admin_access():
         
         return True
 
+# 📊 업로드 처리 진행률 표시
+# 단계별 (표시 이름, 시작 비율, 끝 비율)
+PROGRESS_PHASES = {
+    "read": ("📥 파일 읽기 · 매핑", 0.0, 0.60),
+    "sanitize": ("🔒 민감정보 제거", 0.60, 0.65),
+    "aggregate": ("📊 출고 현황 집계", 0.65, 0.70),
+    "box": ("📦 박스 계산", 0.70, 0.85),
+    "persist": ("💾 암호화 저장", 0.85, 1.0),
+}
+
+class ProgressReporter:
+    """업로드 처리 진행률 표시 - 단계 전환 시 + 일정 간격(행 수/경과 시간)으로만 화면 갱신"""
+    
+    def __init__(self, min_interval=0.5, min_rows=2000):
+        self.min_interval = min_interval  # 최소 갱신 간격 (초)
+        self.min_rows = min_rows  # 최소 갱신 간격 (행 수)
+        self.progress_bar = st.progress(0)
+        self.status_text = st.empty()
+        self.current_phase = None
+        self._last_time = 0.0
+        self._last_rows = 0
+    
+    def phase(self, name, detail=""):
+        """새 단계 시작 - 항상 화면 갱신"""
+        self.current_phase = name
+        self._last_rows = 0
+        label, start, _ = PROGRESS_PHASES[name]
+        self._render(start, f"{label} {detail}".strip())
+    
+    def update(self, done, total=None):
+        """현재 단계 내 진행률 갱신 - 간격을 넘었거나 마지막 행일 때만 화면 갱신 (전체 행 수를 모르면 행 수만 표시)"""
+        if self.current_phase is None:
+            return
+        
+        now = time.monotonic()
+        is_last = bool(total) and done >= total
+        if not is_last and done - self._last_rows < self.min_rows and now - self._last_time < self.min_interval:
+            return
+        
+        self._last_rows = done
+        label, start, end = PROGRESS_PHASES[self.current_phase]
+        if not total:
+            self._render(start, f"{label} {done:,}행")
+            return
+        
+        ratio = min(done / total, 1.0)
+        self._render(start + (end - start) * ratio, f"{label} {done:,}/{total:,} ({ratio:.1%})")
+    
+    def _render(self, value, text):
+        self._last_time = time.monotonic()
+        self.progress_bar.progress(min(max(value, 0.0), 1.0))
+        self.status_text.text(text)
+    
+    def close(self):
+        """프로그레스 바 정리"""
+        self.progress_bar.empty()
+        self.status_text.empty()
+
 # 🔧 엑셀 파일 읽기 함수
 def read_excel_file_safely(uploaded_file):
     """안전한 엑셀 파일 읽기 - 개선된 에러 처리"""
@@ -556,273 +536,744 @@ def read_excel_file_safely(uploaded_file):
     
     return df
 
-# ✅ 새로운 용량 표준화 함수들 (용도별 분리)
-def standardize_capacity_for_display(capacity):
-    """용량 표준화 - 출고 현황/재고 관리용 (200ml 그대로 표시)"""
-    if not capacity:
-        return ""
-    
-    capacity = str(capacity)
-    
-    if re.match(r'1\.5L', capacity, re.IGNORECASE):
-        return "1.5L"
-    if re.match(r'1L|1000ml', capacity, re.IGNORECASE):
-        return "1L"
-    if re.match(r'500ml', capacity, re.IGNORECASE):
-        return "500ml"
-    if re.match(r'240ml', capacity, re.IGNORECASE):
-        return "240ml"
-    if re.match(r'200ml', capacity, re.IGNORECASE):
-        return "200ml"  # 200ml 그대로 유지
-    
-    return capacity
-
-def standardize_capacity_for_box(capacity):
-    """용량 표준화 - 박스 계산용 (200ml → 240ml 변환)"""
-    if not capacity:
-        return ""
-    
-    capacity = str(capacity)
-    
-    if re.match(r'1\.5L', capacity, re.IGNORECASE):
-        return "1.5L"
-    if re.match(r'1L|1000ml', capacity, re.IGNORECASE):
-        return "1L"
-    if re.match(r'500ml', capacity, re.IGNORECASE):
-        return "500ml"
-    if re.match(r'240ml', capacity, re.IGNORECASE):
-        return "240ml"
-    if re.match(r'200ml', capacity, re.IGNORECASE):
-        return "240ml"  # 200ml → 240ml 변환
-    
-    return capacity
+# 📥 대용량 엑셀 스트리밍 읽기 (한 번에 읽을 행 수)
+STREAM_CHUNK_ROWS = 5000
 
-# 📦 박스 계산 함수들 (완전히 새로운 방식)
-def group_orders_by_recipient_new(df):
-    """수취인별로 주문을 그룹화하여 박스 계산 - 새로운 매핑 방식"""
-    orders = defaultdict(dict)
-    
-    for _, row in df.iterrows():
-        # 복합 키 생성: 수취인이름 + 주문자이름으로 동명이인 구분
-        recipient_name = row.get('수취인이름', '알 수 없음')
-        orderer_name = row.get('주문자이름', '').strip()
-
-        # 고유 식별자 생성
-        if orderer_name and orderer_name != recipient_name:
-            recipient_key = f"{recipient_name} - 주문자: {orderer_name}"
-        else:
-            recipient_key = f"{recipient_name} - 직접주문"
+def iter_excel_chunks_streaming(workbook, file_name, chunk_rows=STREAM_CHUNK_ROWS, progress=None):
+    """openpyxl 읽기 전용 모드로 안전 컬럼만 청크 단위로 읽기
+    
+    헤더를 먼저 표준화해 안전 컬럼 위치만 골라내므로 그 외 개인정보 컬럼은 DataFrame으로 만들지 않습니다.
+    pd.read_excel과 같이 첫 행을 헤더로 쓰고 끝부분의 빈 행은 제외하며, 인덱스는 파일 전체 기준 행 번호입니다.
+    """
+    try:
+        sheet = workbook.worksheets[0]
+        rows = sheet.iter_rows(values_only=True)
+        header = next(rows, None)
+        if header is None:
+            st.warning(f"⚠️ {file_name}: 파일이 비어있습니다")
+            return
         
-        # ✅ 새로운 매핑 방식 사용
-        product_type, capacity, option_count = get_product_info(
-            row.get('상품이름', ''), 
-            row.get('옵션이름', '')
-        )
+        # 헤더 표준화 후 안전 컬럼 위치만 선택 (같은 이름이면 첫 번째 컬럼)
+        report_detected_columns(header)
+        positions = {}
+        for position, name in enumerate(header):
+            name = COLUMN_RENAME_MAP.get(name, name)
+            if name in SAFE_COLUMNS and name not in positions:
+                positions[name] = position
         
-        try:
-            base_quantity = int(row.get('상품수량', 1))
-        except (ValueError, TypeError):
-            base_quantity = 1
+        if not check_essential_columns(positions):
+            return
         
-        total_quantity = base_quantity * option_count
+        columns = sorted(positions, key=positions.get)
+        column_positions = [positions[name] for name in columns]
+        st.success(f"✅ 새로운 양식 처리 완료: {columns}")
         
-        # 박스 계산용 용량 표준화 (200ml → 240ml)
-        standardized_capacity = standardize_capacity_for_box(capacity)
+        estimated_rows = (sheet.max_row - 1) if sheet.max_row else None
+        if progress:
+            progress.phase("read", f"(약 {estimated_rows:,}행)" if estimated_rows else "")
         
-        if standardized_capacity:
-            key = f"{product_type} {standardized_capacity}"
-        else:
-            key = product_type
+        chunk = []
+        pending_empty = 0  # 빈 행은 뒤에 데이터가 있을 때만 포함 (끝부분 빈 행 제외)
+        offset = 0
+        for row in rows:
+            values = [row[position] if position < len(row) else None for position in column_positions]
+            if all(value is None or value == '' for value in values):
+                pending_empty += 1
+                continue
+            
+            chunk.extend([[None] * len(columns)] * pending_empty)
+            pending_empty = 0
+            chunk.append(values)
+            
+            if len(chunk) >= chunk_rows:
+                yield pd.DataFrame(chunk, columns=columns, index=range(offset, offset + len(chunk))).fillna(np.nan)
+                offset += len(chunk)
+                chunk = []
+                if progress:
+                    progress.update(offset, estimated_rows)
+        
+        if chunk:
+            yield pd.DataFrame(chunk, columns=columns, index=range(offset, offset + len(chunk))).fillna(np.nan)
+            offset += len(chunk)
         
-        orders[recipient_key][key] = orders[recipient_key].get(key, 0) + total_quantity
+        if offset == 0:
+            st.warning(f"⚠️ {file_name}: 파일이 비어있습니다")
     
-    return orders
+    finally:
+        workbook.close()
 
-def get_product_quantities(order_products):
-    """주문 제품에서 용량별 수량 집계 - 새로운 규칙"""
-    quantities = defaultdict(int)
+def iter_sanitized_chunks(uploaded_file, progress=None):
+    """민감정보를 제거한 데이터를 청크 단위로 반환 - 스트리밍 실패 시 전체 읽기로 대체"""
+    try:
+        uploaded_file.seek(0)
+        workbook = openpyxl.load_workbook(uploaded_file, read_only=True, data_only=True)
+    except Exception:
+        st.info(f"ℹ️ {uploaded_file.name}: 스트리밍 읽기를 사용할 수 없어 전체 읽기로 처리합니다")
+        df = ingest_uploaded_file(uploaded_file, progress)
+        if not df.empty:
+            yield df
+        return
+    
+    yield from iter_excel_chunks_streaming(workbook, uploaded_file.name, progress=progress)
+
+def coerce_quantity(series):
+    """상품수량 컬럼을 정수로 변환 (숫자가 아니면 1개로 처리)"""
+    quantity = pd.to_numeric(series, errors='coerce')
+    quantity = quantity.where(np.isfinite(quantity), 1)
+    return np.trunc(quantity).astype('int64')
+
+def map_product_columns(df):
+    """고유한 (상품이름, 옵션이름) 조합만 매핑한 뒤 결과를 컬럼으로 붙이기"""
+    pair_columns = ['상품이름', '옵션이름']
+    pair_codes = df.groupby(pair_columns, sort=False, dropna=False).ngroup().to_numpy()
+    
+    # 조합별로 한 번만 매핑 (그룹 번호는 첫 등장 순서와 같음)
+    first_rows = df.loc[~pd.Series(pair_codes).duplicated().to_numpy(), pair_columns]
+    lookup = pd.DataFrame(
+        get_product_info_many(first_rows.itertuples(index=False, name=None)),
+        columns=['제품분류', '용량', '옵션개수']
+    )
     
-    for product_key, qty in order_products.items():
-        if '1.5L' in product_key:
-            quantities['1.5L'] += qty
-        elif '1L' in product_key:
-            quantities['1L'] += qty
-        elif '500ml' in product_key:
-            quantities['500ml'] += qty
-        elif '240ml' in product_key:
-            quantities['240ml'] += qty
-        elif '200ml' in product_key:
-            quantities['240ml'] += qty  # 200ml → 240ml 변환
+    # 용량 표준화도 조합별로 한 번만 수행 (표기별 결과는 카탈로그에서 캐시)
+    display_capacity = lookup['용량'].map(standardize_capacity_for_display)
+    box_capacity = lookup['용량'].map(standardize_capacity_for_box)
+    lookup['출고키'] = np.where(display_capacity != "", lookup['제품분류'] + " " + display_capacity, lookup['제품분류'])
+    lookup['박스키'] = np.where(box_capacity != "", lookup['제품분류'] + " " + box_capacity, lookup['제품분류'])
     
-    return quantities
+    mapped = lookup.take(pair_codes)
+    mapped.index = df.index
+    mapped['총수량'] = coerce_quantity(df['상품수량']) * mapped['옵션개수']
+    return mapped
 
-def calculate_box_for_order(quantities):
-    """단일 주문에 대한 박스 계산 - 새로운 간단 규칙"""
+# 📦 박스 계산 함수들 (완전히 새로운 방식)
+def get_box_capacity(product_key):
+    """제품 키에서 박스 계산용 용량 추출 (200ml → 240ml 변환, 카탈로그 SKU 기준)"""
+    return get_sku(product_key).box_capacity
+
+def build_recipient_keys(df):
+    """수취인 고유 키 생성 (벡터화) - 수취인이름 + 주문자이름으로 동명이인 구분"""
+    if '수취인이름' in df.columns:
+        recipient_names = df['수취인이름'].astype(str)
+    else:
+        recipient_names = pd.Series('알 수 없음', index=df.index)
+    
+    if '주문자이름' in df.columns:
+        orderer_names = df['주문자이름'].fillna('').astype(str).str.strip()
+    else:
+        orderer_names = pd.Series('', index=df.index)
+    
+    ordered_by_other = (orderer_names != '') & (orderer_names != recipient_names)
+    return pd.Series(
+        np.where(
+            ordered_by_other,
+            recipient_names + " - 주문자: " + orderer_names,
+            recipient_names + " - 직접주문"
+        ),
+        index=df.index
+    )
+
+def aggregate_recipient_products(df, mapped):
+    """수취인 × 제품별 수량 합계 (첫 등장 순서 유지) - 청크별 부분 집계에도 사용"""
+    rows = pd.DataFrame({
+        '수취인': build_recipient_keys(df).to_numpy(),
+        '박스키': mapped['박스키'].to_numpy(),
+        '총수량': mapped['총수량'].to_numpy()
+    })
+    return rows.groupby(['수취인', '박스키'], sort=False)['총수량'].sum()
+
+# 수취인별 주문 수량표 (행: recipients 순서)
+# products: 수취인 × 제품(skus 순서) 수량 / capacities: 수취인 × 박스 용량(BOX_CAPACITIES 순서) 수량
+RecipientOrders = namedtuple("RecipientOrders", ["recipients", "skus", "products", "capacities"])
+
+def build_recipient_orders(product_totals):
+    """수취인 × 제품별 수량 합계 → 정수 코드 주문 수량표 (수취인/제품은 첫 등장 순서)"""
+    recipient_codes, recipients = pd.factorize(product_totals.index.get_level_values(0))
+    sku_codes, skus = pd.factorize(product_totals.index.get_level_values(1))
+    products = np.zeros((len(recipients), len(skus)), dtype=ORDER_QUANTITY_DTYPE)
+    np.add.at(products, (recipient_codes, sku_codes), product_totals.to_numpy(dtype=ORDER_QUANTITY_DTYPE))
+    
+    # 제품 → 박스 용량 열 (용량이 없는 기타 제품은 어느 용량에도 더하지 않음)
+    sku_capacities = np.zeros((len(skus), len(BOX_CAPACITIES)), dtype=ORDER_QUANTITY_DTYPE)
+    for sku_code, product_key in enumerate(skus):
+        capacity_code = BOX_CAPACITY_INDEX.get(get_box_capacity(product_key))
+        if capacity_code is not None:
+            sku_capacities[sku_code, capacity_code] = 1
+    
+    return RecipientOrders(recipients, list(skus), products, products @ sku_capacities)
+
+def group_orders_by_recipient_new(df, mapped=None):
+    """수취인별로 주문을 그룹화 (벡터화) - 정수 코드 주문 수량표 반환"""
+    if mapped is None:
+        mapped = map_product_columns(df)
+    
+    return build_recipient_orders(aggregate_recipient_products(df, mapped))
+
+def assign_boxes(quantities, rule_table=BOX_RULE_TABLE):
+    """수취인 × 용량 수량 행렬(BOX_CAPACITIES 순서) 전체에 박스 규칙 범위표를 한 번에 적용"""
+    assigned = np.full(len(quantities), REVIEW_BOX, dtype=object)
     
     # 1단계: 혼합 주문 체크 (여러 용량이 섞여있으면 검토 필요)
-    non_zero_capacities = [cap for cap, qty in quantities.items() if qty > 0]
-    if len(non_zero_capacities) > 1:
-        return "검토 필요"
-    
-    # 2단계: 단일 용량 박스 매칭
-    for capacity, qty in quantities.items():
-        if qty > 0:
-            # 박스 A: 1L 1~2개 or 500ml 1~3개 or 240ml 1~5개
-            if capacity == "1L" and 1 <= qty <= 2:
-                return "박스 A"
-            elif capacity == "500ml" and 1 <= qty <= 3:
-                return "박스 A"
-            elif capacity == "240ml" and 1 <= qty <= 5:
-                return "박스 A"
-            
-            # 박스 B: 1L 3~4개 or 500ml 4~6개 or 240ml 6~10개
-            elif capacity == "1L" and 3 <= qty <= 4:
-                return "박스 B"
-            elif capacity == "500ml" and 4 <= qty <= 6:
-                return "박스 B"
-            elif capacity == "240ml" and 6 <= qty <= 10:
-                return "박스 B"
-            
-            # 박스 C: 500ml 10개
-            elif capacity == "500ml" and qty == 10:
-                return "박스 C"
-            
-            # 박스 D: 1L 5~6개
-            elif capacity == "1L" and 5 <= qty <= 6:
-                return "박스 D"
-            
-            # 박스 E: 1.5L 3~4개
-            elif capacity == "1.5L" and 3 <= qty <= 4:
-                return "박스 E"
+    single_capacity = (quantities > 0).sum(axis=1) <= MAX_CAPACITIES_PER_BOX
+    
+    # 2단계: 단일 용량 박스 매칭 (먼저 맞는 규칙 우선)
+    for box_name, capacity, low, high in rule_table.itertuples(index=False, name=None):
+        qty = quantities[:, BOX_CAPACITY_INDEX[capacity]]
+        matched = single_capacity & (assigned == REVIEW_BOX) & (qty >= low) & (qty <= high)
+        assigned[matched] = box_name
+    
+    # 3단계: 어떤 박스 조건도 만족하지 않으면 검토 필요 (기본값 유지)
+    return assigned
+
+# 🧩 혼합 주문 포장 최적화 (박스 규칙에 맞지 않는 주문용)
+_PACKING_SCALE = math.lcm(*[high for capacities in BOX_RULES.values() for _, high in capacities.values()])
+
+# 박스별 용량 1개가 차지하는 적재 단위 (박스 전체 = _PACKING_SCALE, 담을 수 없으면 None)
+_PACKING_UNITS = {
+    box_name: tuple(
+        _PACKING_SCALE // BOX_RULES[box_name][capacity][1] if capacity in BOX_RULES[box_name] else None
+        for capacity in BOX_CAPACITIES
+    )
+    for box_name in sorted(BOX_RULES, key=lambda x: BOX_COST_ORDER.get(x, 999))
+}
+
+def _maximal_box_loads(quantities, units):
+    """박스 하나에 더 넣을 수 없을 때까지 채운 적재 조합 목록"""
+    loads = []
+    load = []
+    
+    def fill(index, remaining):
+        if index == len(quantities):
+            is_maximal = all(
+                unit is None or load[i] == quantities[i] or unit > remaining
+                for i, unit in enumerate(units)
+            )
+            if any(load) and is_maximal:
+                loads.append(tuple(load))
+            return
+        
+        unit = units[index]
+        most = 0 if unit is None else min(quantities[index], remaining // unit)
+        for count in range(most, -1, -1):
+            load.append(count)
+            fill(index + 1, remaining - count * (unit or 0))
+            load.pop()
+    
+    fill(0, _PACKING_SCALE)
+    return loads
+
+@functools.lru_cache(maxsize=None)
+def _rule_box_for_load(load):
+    """한 용량만 담은 적재에 박스 규칙이 정한 박스 (여러 용량이 섞였거나 규칙 밖이면 None)"""
+    box_name = assign_boxes(np.array([load], dtype=ORDER_QUANTITY_DTYPE))[0]
+    return None if box_name == REVIEW_BOX else box_name
+
+def _packing_score(packing, objective):
+    """포장 조합 비교 기준 (작을수록 좋음)"""
+    box_count = len(packing)
+    box_cost = sum(BOX_COST_ORDER.get(box_name, 999) for box_name, _ in packing)
+    return (box_cost, box_count) if objective == "cost" else (box_count, box_cost)
+
+@functools.lru_cache(maxsize=65536)
+def pack_mixed_order(quantities, objective=PACKING_OBJECTIVE):
+    """용량별 수량 벡터(BOX_CAPACITIES 순서)를 최적의 박스 조합으로 포장 - 불가능하면 None
+    
+    같은 수량 조합은 여러 주문에서 반복되므로 결과를 수량 벡터 기준으로 캐시합니다.
+    """
+    if not any(quantities):
+        return ()
+    
+    best = None
+    for box_name, units in _PACKING_UNITS.items():
+        for load in _maximal_box_loads(quantities, units):
+            # 한 용량만 담는 박스는 박스 규칙과 같은 박스 사용 (예: 1.5L 1~2개는 박스 E가 아니라 박스 F)
+            rule_box = _rule_box_for_load(load)
+            if rule_box is not None and rule_box != box_name:
+                continue
             
-            # 박스 F: 1.5L 1~2개
-            elif capacity == "1.5L" and 1 <= qty <= 2:
-                return "박스 F"
+            rest = pack_mixed_order(tuple(q - l for q, l in zip(quantities, load)), objective)
+            if rest is None:
+                continue
+            candidate = ((box_name, load),) + rest
+            if best is None or _packing_score(candidate, objective) < _packing_score(best, objective):
+                best = candidate
     
-    # 3단계: 어떤 박스 조건도 만족하지 않으면 검토 필요
-    return "검토 필요"
+    return best
+
+def pack_review_order(quantities):
+    """검토 필요 주문의 박스 조합 계산 (quantities: BOX_CAPACITIES 순서 수량) - [(박스, {용량: 수량}), ...] 또는 None"""
+    vector = tuple(max(int(quantity), 0) for quantity in quantities)
+    if not any(vector) or sum(vector) > PACKING_MAX_BOTTLES:
+        return None
+    
+    packing = pack_mixed_order(vector)
+    if not packing:
+        return None
+    
+    return [
+        (box_name, {capacity: count for capacity, count in zip(BOX_CAPACITIES, load) if count > 0})
+        for box_name, load in sorted(packing, key=lambda x: BOX_COST_ORDER.get(x[0], 999))
+    ]
+
+def calculate_box_for_order(quantities):
+    """단일 주문에 대한 박스 계산 - 박스 규칙 범위표 사용"""
+    vector = [quantities.get(capacity, 0) for capacity in BOX_CAPACITIES]
+    return assign_boxes(np.array([vector], dtype=ORDER_QUANTITY_DTYPE))[0]
 
 def calculate_box_requirements_new(df):
     """전체 박스 필요량 계산 - 새로운 매핑 로직"""
-    orders = group_orders_by_recipient_new(df)
+    return calculate_box_requirements_from_orders(group_orders_by_recipient_new(df))
+
+def calculate_box_requirements_from_orders(orders):
+    """수취인별 주문 수량표로부터 박스 필요량 계산
     
-    total_boxes = defaultdict(int)
-    review_orders = []  # 검토 필요 주문들
+    박스 규칙에 맞지 않는 주문은 혼합 포장을 시도하고, 포장할 수 없는 주문만 검토 필요로 분류합니다.
+    """
+    assigned = assign_boxes(orders.capacities)
     
-    for recipient, products in orders.items():
-        quantities = get_product_quantities(products)
-        box_result = calculate_box_for_order(quantities)
+    is_review = assigned == REVIEW_BOX
+    box_counts = pd.Series(assigned[~is_review]).value_counts(sort=False)
+    total_boxes = defaultdict(int, {box_name: int(count) for box_name, count in box_counts.items()})
+    
+    review_orders = []  # 검토 필요 주문들
+    packed_orders = []  # 혼합 포장으로 처리한 주문들
+    for row in np.flatnonzero(is_review):
+        recipient = orders.recipients[row]
+        capacity_row = orders.capacities[row]
+        packing = pack_review_order(capacity_row)
         
-        if box_result == "검토 필요":
+        # 규칙 밖 주문의 용량별 수량 (주문에 포함된 용량만 기록)
+        quantities = {
+            capacity: int(quantity)
+            for capacity, quantity in zip(BOX_CAPACITIES, capacity_row) if quantity
+        }
+        
+        if packing is None:
+            product_row = orders.products[row]
             review_orders.append({
                 'recipient': recipient,
                 'quantities': quantities,
-                'products': products
+                'products': {
+                    product_key: int(quantity)
+                    for product_key, quantity in zip(orders.skus, product_row) if quantity
+                }
             })
-        else:
-            total_boxes[box_result] += 1
+            continue
+        
+        for box_name, _ in packing:
+            total_boxes[box_name] += 1
+        packed_orders.append({
+            'recipient': recipient,
+            'quantities': quantities,
+            'boxes': packing
+        })
+    
+    return total_boxes, review_orders, packed_orders
+
+def build_box_results(total_boxes, review_orders, packed_orders=()):
+    """박스 계산 결과를 저장용 딕셔너리로 변환"""
+    return {
+        'total_boxes': dict(total_boxes),
+        'box_e_orders': [
+            {
+                'recipient': order['recipient'],
+                'quantities': dict(order['quantities']),
+                'products': dict(order['products'])
+            }
+            for order in review_orders
+        ],
+        'packed_orders': [
+            {
+                'recipient': order['recipient'],
+                'quantities': dict(order['quantities']),
+                'boxes': [{'box': box_name, 'contents': contents} for box_name, contents in order['boxes']]
+            }
+            for order in packed_orders
+        ]
+    }
+
+# 🔁 재업로드 변경분 반영
+def get_fingerprint_key():
+    """행 지문용 해시 키 (암호화 키에서 파생 - 키 없이는 지문으로 원래 값을 맞춰볼 수 없음)"""
+    return hashlib.sha256(f"row-fingerprint:{st.secrets['encryption_key']}".encode()).hexdigest()[:16]
+
+def hash_recipients(recipient_keys, hash_key):
+    """수취인 키 → 수취인 토큰 (uint64)"""
+    return pd.util.hash_pandas_object(
+        pd.Series(recipient_keys, dtype=object), index=False, hash_key=hash_key
+    ).to_numpy()
+
+def fingerprint_rows(df, recipient_keys, hash_key):
+    """행 지문 (uint64) - 집계에 쓰이는 값(상품이름, 옵션이름, 수량, 수취인 키)만 사용"""
+    values = pd.DataFrame({
+        '상품이름': df['상품이름'].astype(str).to_numpy(dtype=object),
+        '옵션이름': df['옵션이름'].astype(str).to_numpy(dtype=object),
+        '상품수량': coerce_quantity(df['상품수량']).to_numpy(),
+        '수취인': recipient_keys,
+    })
+    return pd.util.hash_pandas_object(values, index=False, hash_key=hash_key).to_numpy()
+
+def digest_upload_results(results, box_results):
+    """저장된 결과가 색인을 만들 때의 결과와 같은지 확인하는 요약값"""
+    payload = json.dumps([results or {}, box_results or {}], ensure_ascii=False, sort_keys=True, separators=(",", ":"))
+    return hashlib.sha256(payload.encode()).hexdigest()[:16]
+
+def build_upload_index(rows, has_recipient, results, box_results):
+    """행 지문 표 → 저장용 업로드 색인 (제품 키는 코드로, 열은 이진 배열로 저장)"""
+    key_codes, keys = pd.factorize(pd.concat([rows['shipment_key'], rows['box_key']], ignore_index=True))
+    columns = rows.assign(shipment_key=key_codes[:len(rows)], box_key=key_codes[len(rows):])
+    return {
+        'format': UPLOAD_INDEX_FORMAT,
+        'signature': UPLOAD_INDEX_SIGNATURE,
+        'has_recipient': has_recipient,
+        'results_digest': digest_upload_results(results, box_results if has_recipient else {}),
+        'keys': list(keys),
+        'columns': {
+            name: base64.b64encode(columns[name].to_numpy(dtype=dtype).tobytes()).decode()
+            for name, dtype in UPLOAD_INDEX_COLUMNS.items()
+        }
+    }
+
+def decode_upload_index(upload_index):
+    """저장된 업로드 색인 → 행 지문 표"""
+    keys = np.array(upload_index['keys'], dtype=object)
+    rows = pd.DataFrame({
+        name: np.frombuffer(base64.b64decode(upload_index['columns'][name]), dtype=dtype)
+        for name, dtype in UPLOAD_INDEX_COLUMNS.items()
+    })
+    rows['shipment_key'] = keys[rows['shipment_key'].to_numpy()]
+    rows['box_key'] = keys[rows['box_key'].to_numpy()]
+    return rows
+
+def load_previous_upload(previous):
+    """이전 업로드 색인이 현재 규칙·저장된 결과와 맞으면 (행 지문 표, 출고 현황, 박스 계산, 수취인 포함 여부), 아니면 None"""
+    if not previous:
+        return None
+    
+    upload_index, _ = previous.get("upload_index", ({}, None))
+    results, _ = previous.get("shipment", ({}, None))
+    box_results, _ = previous.get("box", ({}, None))
+    if not upload_index or upload_index.get('format') != UPLOAD_INDEX_FORMAT:
+        return None
+    if upload_index.get('signature') != UPLOAD_INDEX_SIGNATURE:
+        return None
+    
+    has_recipient = upload_index.get('has_recipient', False)
+    if not has_recipient:
+        box_results = {}
+    if upload_index.get('results_digest') != digest_upload_results(results, box_results):
+        return None
+    
+    try:
+        rows = decode_upload_index(upload_index)
+    except (KeyError, IndexError, TypeError, ValueError, binascii.Error):
+        return None
+    return rows, results or {}, box_results or {}, has_recipient
+
+def sum_recipient_products(rows, recipients, recipient_names=None):
+    """행 지문 표에서 지정한 수취인들의 수취인 × 제품별 수량 합계 (recipient_names가 있으면 토큰 대신 수취인 키로)"""
+    rows = rows[rows['recipient'].isin(recipients)]
+    recipient = rows['recipient'] if recipient_names is None else rows['recipient'].map(recipient_names)
+    return (rows['count'] * rows['quantity']).groupby([recipient.to_numpy(), rows['box_key'].to_numpy()], sort=False).sum()
+
+def apply_box_changes(stored_box, previous_rows, current_rows, recipients, recipient_names, hash_key):
+    """변경된 수취인들만 박스를 다시 계산해 저장된 박스 계산 결과에 반영"""
+    # 변경 전/후 박스 계산 (같은 규칙이므로 변경 전 결과는 저장된 결과에 포함된 값과 같음)
+    previous_boxes = {}
+    if len(previous_rows):
+        previous_boxes, _, _ = calculate_box_requirements_from_orders(
+            build_recipient_orders(sum_recipient_products(previous_rows, recipients))
+        )
+    current_boxes, review_orders, packed_orders = calculate_box_requirements_from_orders(
+        build_recipient_orders(sum_recipient_products(current_rows, recipients, recipient_names))
+    )
+    
+    total_boxes = defaultdict(int, stored_box.get('total_boxes', {}))
+    for box_name, count in previous_boxes.items():
+        total_boxes[box_name] -= count
+    for box_name, count in current_boxes.items():
+        total_boxes[box_name] += count
+    
+    # 변경된 수취인의 기존 검토/혼합 포장 주문은 새 계산 결과로 교체
+    changed = set(recipients)
+    def unchanged_orders(orders):
+        tokens = hash_recipients([order['recipient'] for order in orders], hash_key)
+        return [order for order, token in zip(orders, tokens) if token not in changed]
+    
+    box_results = build_box_results(
+        {box_name: count for box_name, count in total_boxes.items() if count > 0},
+        review_orders,
+        packed_orders
+    )
     
-    return total_boxes, review_orders
+    # 검토/혼합 포장 목록은 전체 처리와 같이 이번 파일의 수취인 첫 등장 순서로 (검토 목록 번호 유지)
+    recipient_order = {recipient: position for position, recipient in enumerate(recipient_names.to_numpy())}
+    for name in ('box_e_orders', 'packed_orders'):
+        box_results[name] = sorted(
+            unchanged_orders(stored_box.get(name, [])) + box_results[name],
+            key=lambda order: recipient_order.get(order['recipient'], len(recipient_order))
+        )
+    return box_results
+
+def ingest_uploaded_file(uploaded_file, progress=None):
+    """업로드 파일을 한 번만 읽고 민감정보를 제거한 DataFrame 반환"""
+    if progress:
+        progress.phase("read")
+    df = read_excel_file_safely(uploaded_file)
 
-def process_unified_file_new(uploaded_file):
-    """통합 엑셀 파일 처리 - 새로운 매핑 방식 (개선된 메모리 관리)"""
+    if df is None:
+        return pd.DataFrame()
+
+    if progress:
+        progress.phase("sanitize", f"(총 {len(df):,}행)")
+    return sanitize_data(df)
+
+def process_unified_file_new(uploaded_file, progress=None, previous=None):
+    """통합 엑셀 파일 처리 - 한 번 읽은 데이터로 출고 현황과 박스 계산을 함께 집계
+    
+    파일은 청크 단위로 읽어 행마다 지문만 남기고, 이전 업로드 색인(previous)에 없는 행만 매핑합니다.
+    지문별 행 수를 이전 업로드와 비교해 추가/삭제된 행만 저장된 결과에 반영하므로
+    수정된 파일을 다시 올리면 변경된 행 수에 비례한 시간만 걸립니다. (이전 색인이 없으면 전체가 추가된 행)
+    
+    Returns:
+        tuple: (출고 현황, 처리 파일, 매핑 통계, 박스 계산, 업로드 색인)
+    """
+    # 진행률 표시가 넘어오지 않으면 직접 생성 후 정리
+    owns_progress = progress is None
+    if owns_progress:
+        progress = ProgressReporter()
+    
     try:
-        df = read_excel_file_safely(uploaded_file)
+        st.write(f"📄 **{uploaded_file.name}**: 통합 파일 처리 시작")
         
-        if df is None:
-            return {}, [], {}
-        
-        df = sanitize_data(df)
-        
-        if df.empty:
-            return {}, [], {}
-        
-        st.write(f"📄 **{uploaded_file.name}**: 통합 파일 처리 시작 (총 {len(df):,}개 주문)")
-        
-        results = defaultdict(int)
-        mapping_failures = []  # 매핑 실패 케이스 추적
-        
-        # 프로그레스 바 추가
-        progress_bar = st.progress(0)
-        status_text = st.empty()
+        hash_key = get_fingerprint_key()
+        base = load_previous_upload(previous)
+        previous_rows, stored_results, stored_box, previous_has_recipient = base or (
+            pd.DataFrame({name: np.array([], dtype=dtype) for name, dtype in UPLOAD_INDEX_COLUMNS.items()}), {}, {}, None
+        )
         
-        total_rows = len(df)
+        mapping_failures = []  # 매핑 실패 케이스 추적 (새로 매핑한 행만)
+        fingerprint_parts = []  # 청크별 행 지문
+        added_parts = []  # 이전 업로드에 없던 행의 지문별 기여분
+        name_parts = []  # 청크별 (수취인 토큰, 수취인 키) - 검토 주문 표시용으로 메모리에만 유지
+        has_recipient = False
+        total_rows = 0
         
-        for index, row in df.iterrows():
-            # 프로그레스 업데이트
-            progress = (index + 1) / total_rows
-            progress_bar.progress(progress)
-            status_text.text(f"처리 중... {index + 1:,}/{total_rows:,} ({progress:.1%})")
+        for chunk in iter_sanitized_chunks(uploaded_file, progress):
+            # 수취인 포함 여부가 달라지면 이전 색인을 쓰지 않음 (전체 다시 처리)
+            has_recipient = '수취인이름' in chunk.columns
+            if base and total_rows == 0 and has_recipient != previous_has_recipient:
+                base = None
+                previous_rows = previous_rows.iloc[:0]
+                stored_results, stored_box = {}, {}
             
-            # ✅ 새로운 매핑 방식 사용
-            product_type, capacity, option_count = get_product_info(
-                row.get('상품이름', ''), 
-                row.get('옵션이름', '')
-            )
+            recipient_keys = build_recipient_keys(chunk).to_numpy(dtype=object)
+            recipients = hash_recipients(recipient_keys, hash_key)
+            fingerprints = fingerprint_rows(chunk, recipient_keys, hash_key)
+            fingerprint_parts.append(fingerprints)
             
-            # 매핑 실패 케이스 기록
-            if product_type == "기타":
-                mapping_failures.append({
-                    'row': index + 1,
-                    'product_name': row.get('상품이름', ''),
-                    'option_name': row.get('옵션이름', ''),
-                    'quantity': row.get('상품수량', 1)
-                })
+            first = ~pd.Series(recipients).duplicated().to_numpy()
+            name_parts.append(pd.Series(recipient_keys[first], index=recipients[first]))
             
-            try:
-                base_quantity = int(row.get('상품수량', 1))
-            except (ValueError, TypeError):
-                base_quantity = 1
+            # ✅ 이전 업로드에 없던 행만 고유 조합 단위 매핑
+            is_new = ~np.isin(fingerprints, previous_rows['fingerprint'].to_numpy())
+            if is_new.any():
+                new_rows = chunk if is_new.all() else chunk.loc[is_new]
+                mapped = map_product_columns(new_rows)
                 
-            total_quantity = base_quantity * option_count
-            
-            # 출고 현황용 용량 표준화 (200ml 그대로)
-            standardized_capacity = standardize_capacity_for_display(capacity)
-            
-            if standardized_capacity:
-                key = f"{product_type} {standardized_capacity}"
-            else:
-                key = product_type
+                # 매핑 실패 케이스 기록
+                failed = new_rows.loc[(mapped['제품분류'] == "기타").to_numpy()]
+                mapping_failures.extend(
+                    {
+                        'row': index + 1,
+                        'product_name': product_name,
+                        'option_name': option_name,
+                        'quantity': quantity
+                    }
+                    for index, product_name, option_name, quantity in zip(
+                        failed.index, failed['상품이름'], failed['옵션이름'], failed['상품수량']
+                    )
+                )
+                
+                # 출고 현황용 키(200ml 그대로)와 박스 계산용 키(200ml → 240ml)를 행 지문과 함께 기록
+                added_parts.append(pd.DataFrame({
+                    'fingerprint': fingerprints[is_new],
+                    'shipment_key': mapped['출고키'].to_numpy(),
+                    'box_key': mapped['박스키'].to_numpy(),
+                    'quantity': mapped['총수량'].to_numpy(),
+                    'recipient': recipients[is_new]
+                }))
+                del mapped
             
-            results[key] += total_quantity
+            total_rows += len(chunk)
+            del chunk
+        
+        if total_rows == 0:
+            return {}, [], {}, {}, {}
+        
+        progress.phase("aggregate", f"(총 {total_rows:,}개 주문)")
         
-        # 프로그레스 바 정리
-        progress_bar.empty()
-        status_text.empty()
+        # 이번 파일의 지문별 행 수 (첫 등장 순서)
+        codes, unique_fingerprints = pd.factorize(np.concatenate(fingerprint_parts))
+        current_counts = pd.DataFrame({'fingerprint': unique_fingerprints, 'count': np.bincount(codes)})
+        del fingerprint_parts, codes
         
-        processed_files = [f"통합 파일 ({len(df):,}개 주문)"]
+        # 지문별 기여분 (이전 색인 + 새로 매핑한 행) → 이번 파일의 행 지문 표
+        contributions = pd.concat(
+            [previous_rows.drop(columns='count')] + [part.drop_duplicates('fingerprint') for part in added_parts],
+            ignore_index=True
+        ).drop_duplicates('fingerprint')
+        current_rows = current_counts.merge(contributions, on='fingerprint', how='left', sort=False)
+        current_rows = current_rows[list(UPLOAD_INDEX_COLUMNS)]
         
-        # 매핑 실패 통계
+        # 지문별 행 수 변화 (추가 +, 삭제 -) - 변화가 있는 행만 결과에 반영
+        changes = pd.concat([current_rows, previous_rows.assign(count=-previous_rows['count'])], ignore_index=True)
+        changes = changes.groupby('fingerprint', sort=False).agg(
+            change=('count', 'sum'),
+            shipment_key=('shipment_key', 'first'),
+            box_key=('box_key', 'first'),
+            quantity=('quantity', 'first'),
+            recipient=('recipient', 'first')
+        )
+        changes = changes[changes['change'] != 0]
+        added_rows = int(changes['change'].clip(lower=0).sum())
+        removed_rows = int(-changes['change'].clip(upper=0).sum())
+        
+        # 출고 현황 변경분 반영 (이번 파일에 남아 있는 제품 키만 유지)
+        results = dict(stored_results)
+        shipment_changes = (changes['change'] * changes['quantity']).groupby(changes['shipment_key'].to_numpy(), sort=False).sum()
+        for key, quantity in shipment_changes.items():
+            results[key] = results.get(key, 0) + int(quantity)
+        current_keys = set(current_rows['shipment_key'])
+        results = {key: quantity for key, quantity in results.items() if key in current_keys}
+        
+        processed_files = [f"통합 파일 ({total_rows:,}개 주문)"]
+        if base:
+            processed_files.append(f"변경분 반영 (추가 {added_rows:,}행 / 삭제 {removed_rows:,}행)")
+        
+        # 매핑 실패 통계 (기타 제품 행 수는 행 지문 표 기준, 상세 내역은 새로 매핑한 행만)
+        failed_count = int(current_rows.loc[current_rows['shipment_key'] == "기타", 'count'].sum())
         mapping_stats = {
-            'total_processed': len(df),
-            'successful_mappings': len(df) - len(mapping_failures),
-            'failed_mappings': len(mapping_failures),
-            'success_rate': ((len(df) - len(mapping_failures)) / len(df) * 100) if len(df) > 0 else 0,
-            'failure_details': mapping_failures
+            'total_processed': total_rows,
+            'successful_mappings': total_rows - failed_count,
+            'failed_mappings': failed_count,
+            'success_rate': ((total_rows - failed_count) / total_rows * 100) if total_rows > 0 else 0,
+            'failure_details': mapping_failures,
+            'incremental': bool(base),
+            'added_rows': added_rows,
+            'removed_rows': removed_rows
         }
         
+        # 박스 계산 (수취인이름이 있는 경우에만) - 행 수가 바뀐 수취인만 다시 계산
+        box_results = {}
+        if has_recipient:
+            progress.phase("box")
+            recipient_names = pd.concat(name_parts)
+            recipient_names = recipient_names[~recipient_names.index.duplicated()]
+            box_results = apply_box_changes(
+                stored_box, previous_rows, current_rows, pd.unique(changes['recipient']), recipient_names, hash_key
+            )
+        
+        upload_index = build_upload_index(current_rows, has_recipient, results, box_results)
+        
         # 메모리 정리 추가
-        del df
+        del added_parts, name_parts, contributions, changes
         gc.collect()
         
-        return results, processed_files, mapping_stats
+        return results, processed_files, mapping_stats, box_results, upload_index
         
     except Exception as e:
         st.error(f"❌ {uploaded_file.name} 처리 중 오류: {str(e)}")
-        return {}, [], {}
-
-def get_product_color(product_name):
-    """상품명에 따른 색상 반환"""
-    if "단호박식혜" in product_name:
-        return "#FFD700"  # 황금색
-    elif "수정과" in product_name:
-        return "#D2B48C"  # 갈색
-    elif "식혜" in product_name and "단호박" not in product_name:
-        return "#654321"  # 갈색
-    elif "플레인" in product_name or "쌀요거트" in product_name:
-        return "#F5F5F5"  # 밝은 회색
-    else:
-        return "#808080"  # 회색
+        return {}, [], {}, {}, {}
+    
+    finally:
+        if owns_progress:
+            progress.close()
+
+# 🧱 카드 HTML 템플릿 - 섹션마다 카드를 모아 한 번에 표시
+def compact_html(template):
+    """여러 줄 HTML 템플릿을 한 줄로 (들여쓰기가 마크다운 코드 블록으로 해석되지 않도록)"""
+    return "".join(line.strip() for line in template.strip().splitlines())
+
+SHIPMENT_CARD_TEMPLATE = compact_html("""
+    <div style="background: {background}; 
+                color: {text_color}; padding: 25px; border-radius: 20px; 
+                margin: 15px 0; box-shadow: 0 6px 12px rgba(0,0,0,0.15);">
+        <div style="display: flex; align-items: center; justify-content: space-between;">
+            <div>
+                <span style="font-size: 28px; font-weight: bold; color: {text_color};">{product_name}</span>
+                <br>
+                <span style="font-size: 24px; font-weight: normal; opacity: 0.85; color: {text_color};">
+                    ({capacity})
+                </span>
+            </div>
+            <div style="text-align: right;">
+                <span style="font-size: 32px; font-weight: bold; color: {text_color};">
+                    {quantity}개
+                </span>
+            </div>
+        </div>
+    </div>
+""")
+
+STOCK_GROUP_TEMPLATE = compact_html("""
+    <div style="background: {card_color}; 
+                padding: 20px; border-radius: 15px; margin: 15px 0; 
+                border-left: 5px solid {border_color};">
+        <h4 style="margin: 0 0 15px 0; color: {text_color}; font-weight: 600;">
+            📦 {product_name}
+        </h4>
+    </div>
+    <div style="display: flex; gap: 1rem; margin-bottom: 1rem;">{items}</div>
+""")
+
+# 용량별 재고 칸 (임계치 이하는 빨간색, 정상 재고는 초록색)
+STOCK_ITEM_TEMPLATE = compact_html("""
+    <div style="flex: 1 1 0; min-width: 0; text-align: center; padding: 10px; 
+                background: white; border-radius: 8px; 
+                border: 2px solid {color};">
+        <div style="font-size: 18px; color: #666; margin-bottom: 5px;">
+            {capacity}
+        </div>
+        <div style="font-size: 24px; font-weight: bold; color: {color};">
+            {quantity}개
+        </div>
+    </div>
+""")
+
+def build_shipment_cards_html(rows):
+    """출고 현황 카드 HTML (rows: (SKU, 수량))"""
+    cards = []
+    for sku, quantity in rows:
+        cards.append(SHIPMENT_CARD_TEMPLATE.format(
+            background=sku.style.card_background,
+            text_color=sku.style.card_text,
+            product_name=html.escape(sku.product),
+            capacity=html.escape(sku.capacity),
+            quantity=quantity
+        ))
+    return "".join(cards)
+
+def build_stock_cards_html(stock_groups):
+    """재고 현황 카드 HTML (stock_groups: 상품명 → [{"SKU", "수량", "위험"}])"""
+    groups = []
+    for product_name, capacities in stock_groups.items():
+        style = capacities[0]["SKU"].style
+        items = "".join(
+            STOCK_ITEM_TEMPLATE.format(
+                color="#f44336" if item["위험"] else "#4caf50",
+                capacity=html.escape(item["SKU"].capacity),
+                quantity=item["수량"]
+            )
+            for item in capacities
+        )
+        groups.append(STOCK_GROUP_TEMPLATE.format(
+            card_color=style.stock_background,
+            border_color=style.stock_border,
+            text_color=style.stock_text,
+            product_name=html.escape(product_name),
+            items=items
+        ))
+    return "".join(groups)
 
 # 한국 시간 기준 날짜 정보 생성
 def get_korean_date():
@@ -842,23 +1293,50 @@ st.markdown("### 🔒 보안 강화 버전")
 if st.session_state.get('admin_mode', False):
     try:
         mapping_stats = get_mapping_stats()
-        st.sidebar.success(f"🎯 매핑 모듈: {mapping_stats['total_cases']}개 케이스 로드됨")
+        st.sidebar.success(f"🎯 매핑 모듈: {mapping_stats['total_cases']}개 케이스 로드됨 (v{mapping_stats['version']})")
     except:
         st.sidebar.warning("⚠️ 매핑 모듈 로드 실패")
 
 # 관리자 권한 확인
 is_admin = check_admin_access()
 
-# 탭 구성
-tab1, tab2, tab3 = st.tabs(["📦 출고 현황", "📦 박스 계산", "📊 재고 관리"])
+# 🗜️ 재고 이력 정리 (관리자 전용)
+if is_admin:
+    with st.sidebar.expander("🗜️ 재고 이력 정리", expanded=False):
+        retention = get_stock_retention()
+        st.caption(
+            f"최근 {retention['full_days']}일: 전체 입력 · {retention['daily_days']}일까지: 날짜별 마지막 입력 · "
+            f"그 이전: 주별 마지막 입력만 보관 파일로 이동"
+        )
+        st.caption("서버 없이 정리: `python compact_stock_history.py`")
+        if st.button("🗜️ 지금 정리", key="compact_stock_history"):
+            try:
+                with st.spinner("재고 이력 정리 중..."):
+                    summary = compact_stock_history()
+            except StorageLoadError as e:
+                st.error(f"❌ 재고 이력을 불러오지 못해 정리하지 않았습니다: {e}")
+            else:
+                if summary is not None and summary["saved"] is False:
+                    st.error("❌ 재고 이력 정리 저장 중 오류가 발생했습니다.")
+                else:
+                    st.success(f"✅ {format_compaction_summary(summary)}")
+
+# 📑 화면 선택 - 선택한 화면의 데이터만 불러와서 표시
+active_view = st.radio(
+    "화면 선택",
+    list(VIEW_DATA),
+    horizontal=True,
+    key="active_view",
+    label_visibility="collapsed"
+)
 
-# 첫 번째 탭: 출고 현황
-with tab1:
+# 첫 번째 화면: 출고 현황
+def render_shipment_view(loaded_data):
+    """출고 현황 화면"""
     st.header("📦 출고 현황")
     
-    # 출고 현황 데이터 로드
-    with st.spinner('📡 출고 현황 데이터 로드 중...'):
-        shipment_results, shipment_last_update = load_shipment_data()
+    # 출고 현황 데이터
+    shipment_results, shipment_last_update = loaded_data["shipment"]
     
     if shipment_results:
         # 출고 현황 계산
@@ -905,90 +1383,28 @@ with tab1:
             </div>
             ''', unsafe_allow_html=True)
         
-        # 출고 현황 테이블 데이터 준비
-        df_data = []
-        for product_key, quantity in sorted(shipment_results.items()):
-            if quantity > 0:
-                parts = product_key.strip().split()
-                if len(parts) >= 2:
-                    last_part = parts[-1]
-                    if re.match(r'\d+(?:\.\d+)?(?:ml|L)', last_part):
-                        product_name = ' '.join(parts[:-1])
-                        capacity = last_part
-                    else:
-                        product_name = product_key
-                        capacity = ""
-                else:
-                    product_name = product_key
-                    capacity = ""
-                
-                df_data.append({
-                    "상품명": product_name,
-                    "용량": capacity,
-                    "수량": quantity
-                })
+        # 출고 현황 카드 데이터 준비 (SKU는 카탈로그에서 조회)
+        card_rows = [
+            (get_sku(product_key), quantity)
+            for product_key, quantity in sorted(shipment_results.items())
+            if quantity > 0
+        ]
         
-        if df_data:
-            df_display = pd.DataFrame(df_data)
-            
+        if card_rows:
             # 상품별 출고 현황 - 카드 형태로 표시
             st.markdown("#### 📦 상품별 출고 현황")
             
-            for i, row in df_display.iterrows():
-                # 상품명에 따라 배경색 결정
-                product_name = row["상품명"]
-                
-                if "단호박식혜" in product_name:
-                    # 노란색 계열
-                    background_color = "linear-gradient(135deg, #ffd700 0%, #ffb300 100%)"
-                    text_color = "#4a4a4a"  # 어두운 회색 (노란색 배경에 잘 보이도록)
-                elif "수정과" in product_name:
-                    # 진갈색 계열
-                    background_color = "linear-gradient(135deg, #8b4513 0%, #654321 100%)"
-                    text_color = "#ffffff"  # 흰색
-                elif "식혜" in product_name and "단호박" not in product_name:
-                    # 연갈색 계열
-                    background_color = "linear-gradient(135deg, #d2b48c 0%, #bc9a6a 100%)"
-                    text_color = "#4a4a4a"  # 어두운 회색 (연갈색 배경에 잘 보이도록)
-                elif "플레인" in product_name or "쌀요거트" in product_name:
-                    # 검정색 계열
-                    background_color = "linear-gradient(135deg, #2c2c2c 0%, #1a1a1a 100%)"
-                    text_color = "#ffffff"  # 흰색
-                else:
-                    # 기본 초록색 (기타 상품)
-                    background_color = "linear-gradient(135deg, #4caf50 0%, #2e7d32 100%)"
-                    text_color = "#ffffff"  # 흰색
-                
-                st.markdown(f"""
-                    <div style="background: {background_color}; 
-                                color: {text_color}; padding: 25px; border-radius: 20px; 
-                                margin: 15px 0; box-shadow: 0 6px 12px rgba(0,0,0,0.15);">
-                        <div style="display: flex; align-items: center; justify-content: space-between;">
-                            <div>
-                                <span style="font-size: 28px; font-weight: bold; color: {text_color};">{row["상품명"]}</span>
-                                <br>
-                                <span style="font-size: 24px; font-weight: normal; opacity: 0.85; color: {text_color};">
-                                    ({row["용량"]})
-                                </span>
-                            </div>
-                            <div style="text-align: right;">
-                                <span style="font-size: 32px; font-weight: bold; color: {text_color};">
-                                    {row["수량"]}개
-                                </span>
-                            </div>
-                        </div>
-                    </div>
-                """, unsafe_allow_html=True)
+            st.markdown(build_shipment_cards_html(card_rows), unsafe_allow_html=True)
     else:
         st.info("📊 **아직 업데이트된 출고 현황이 없습니다. 관리자가 데이터를 업로드할 때까지 기다려주세요.**")
 
-# 두 번째 탭: 박스 계산
-with tab2:
+# 두 번째 화면: 박스 계산
+def render_box_view(loaded_data):
+    """박스 계산 화면"""
     st.header("📦 박스 개수 계산 결과")
     
-    # 박스 계산 데이터 로드
-    with st.spinner('📡 박스 계산 데이터 로드 중...'):
-        box_data, box_last_update = load_box_data()
+    # 박스 계산 데이터
+    box_data, box_last_update = loaded_data["box"]
     
     if box_data:
         total_boxes = box_data.get('total_boxes', {})
@@ -1041,21 +1457,11 @@ with tab2:
         # 일반 박스 계산
         sorted_boxes = sorted(total_boxes.items(), key=lambda x: BOX_COST_ORDER.get(x[0], 999))
 
-        # 박스 설명
-        BOX_DESCRIPTIONS = {
-            "박스 A": "1L 1~2개, 500ml 1~3개, 240ml 1~5개",
-            "박스 B": "1L 3~4개, 500ml 4~6개, 240ml 6~10개", 
-            "박스 C": "500ml 10개",
-            "박스 D": "1L 5~6개",
-            "박스 E": "1.5L 3~4개",
-            "박스 F": "1.5L 1~2개"
-        }
-        
         st.markdown("#### 📦 박스별 필요량")
         
-        # 박스별 필요량을 개선된 형태로 표시
+        # 박스별 필요량을 개선된 형태로 표시 (총 박스 개수에 포함된 박스는 모두 표시)
         for box_name, count in sorted_boxes:
-            if box_name != '박스 E':
+            if count > 0:
                 description = BOX_DESCRIPTIONS.get(box_name, "")
                 
                 # 박스 A, B의 경우 용량 글자 크기를 조금 줄임
@@ -1133,17 +1539,182 @@ with tab2:
                 st.dataframe(summary_df, use_container_width=True)
         else:
             st.success("✅ **모든 주문이 일반 박스(A~D, F)로 처리 가능합니다!**")
-    
+
+        # 혼합 포장 주문 (박스 규칙 밖이지만 자동으로 포장 조합을 계산한 주문)
+        packed_orders = box_data.get('packed_orders', [])
+        if packed_orders:
+            with st.expander(f"🧩 혼합 포장 주문 ({len(packed_orders)}건)", expanded=False):
+                packed_data = []
+                for i, order in enumerate(packed_orders, 1):
+                    quantities = order.get('quantities', {})
+                    order_details = [
+                        f"{capacity} {quantities[capacity]}개"
+                        for capacity in BOX_CAPACITIES if quantities.get(capacity, 0) > 0
+                    ]
+                    packing_details = [
+                        f"{box['box']} ({', '.join(f'{capacity} {count}개' for capacity, count in box['contents'].items())})"
+                        for box in order.get('boxes', [])
+                    ]
+                    packed_data.append({
+                        "포장 대상": f"#{i}",
+                        "주문 내역": ", ".join(order_details),
+                        "포장 방법": " + ".join(packing_details)
+                    })
+
+                st.dataframe(pd.DataFrame(packed_data), use_container_width=True)
+
     else:
         st.info("📦 **박스 계산 데이터를 확인하려면 관리자가 수취인이름이 포함된 통합 엑셀 파일을 업로드해야 합니다.**")
 
-# 세 번째 탭: 재고 관리 (기존 코드와 동일하므로 유지)
-with tab3:
+# 📦 재고 관리 화면의 독립 실행 영역 (상호작용 시 해당 영역만 다시 실행)
+@st.fragment
+def render_shipment_reflection(stock_results, shipment_results, product_keys, today_date_label):
+    """출고 현황 반영 버튼 (버튼 클릭 시 이 영역만 다시 실행)"""
+    st.markdown("### 📦 출고 현황 반영")
+    
+    col1, col2 = st.columns([3, 1])
+    with col1:
+        st.info("💡 **출고 현황 반영**: 현재 재고에서 출고된 수량을 자동으로 차감하여 실제 재고량을 계산합니다.")
+    with col2:
+        st.markdown("<br>", unsafe_allow_html=True)
+        if st.button("📦 출고 현황 반영", help="출고된 수량만큼 재고를 자동으로 차감합니다"):
+            # 현재 재고 이력 로드
+            current_stock = stock_results if stock_results else {}
+            
+            # 최신 재고 입력 가져오기
+            latest_stock = {}
+            if current_stock.get("최근입력"):
+                latest_stock = current_stock["최근입력"]["입력용"].copy()
+            
+            # 출고 현황 적용
+            updated_stock = {}
+            for product_key in product_keys:
+                input_key = get_sku(product_key).input_key
+                
+                # 현재 재고량
+                current_qty = latest_stock.get(input_key, 0)
+                
+                # 출고량 (shipment_results에서 찾기)
+                shipment_qty = shipment_results.get(product_key, 0)
+                
+                # 차감 계산 (0 이하로 내려가지 않게)
+                final_qty = max(0, current_qty - shipment_qty)
+                updated_stock[input_key] = final_qty
+            
+            # 새로운 입력 이력 생성 (조각 재실행 시에도 저장 시점 기준)
+            now = datetime.now(KST)
+            now_str = now.strftime("%Y-%m-%d %H:%M:%S")
+            new_entry = {
+                "입력일시": now_str,
+                "입력용": updated_stock.copy(),
+                "출고반영": True  # 출고 반영 표시
+            }
+            
+            # 최근 재고 + 이번 달 이력에 저장
+            commit_message = f"출고 현황 반영 {today_date_label} {now.strftime('%H:%M')}"
+            save_success = save_stock_entry(current_stock, new_entry, commit_message)
+            
+            if save_success:
+                st.success("✅ 출고 현황이 재고에 성공적으로 반영되었습니다!")
+                st.balloons()
+                time.sleep(1)
+                st.rerun()
+            else:
+                st.error("❌ 출고 현황 반영 중 오류가 발생했습니다. 다시 시도해주세요.")
+
+@st.fragment
+def render_stock_input_form(stock_results, product_keys, today_date_label):
+    """재고 입력 폼 (저장 시 이 영역만 다시 실행, 저장 성공 시 전체 새로고침)"""
+    with st.form(f"stock_input_{today_date_label}"):
+        st.markdown("#### 💾 재고 수량 입력")
+        st.markdown("상품/용량별로 현재 남은 재고 개수를 입력하세요")
+        
+        stock_input = {}
+        
+        # 상품별로 그룹화
+        product_groups = {}
+        for product_key in product_keys:
+            sku = get_sku(product_key)
+            if sku.product not in product_groups:
+                product_groups[sku.product] = []
+            product_groups[sku.product].append((sku.capacity, product_key))
+        
+        # 상품별 입력 필드 생성
+        for product_name, capacities in sorted(product_groups.items()):
+            st.markdown(f"**📦 {product_name}**")
+            
+            # 용량별로 컬럼 생성
+            if len(capacities) > 1:
+                cols = st.columns(len(capacities))
+                for i, (capacity, product_key) in enumerate(capacities):
+                    with cols[i]:
+                        # 기존 재고 값 가져오기 (있다면)
+                        existing_value = 0
+                        if stock_results and stock_results.get("최근입력"):
+                            input_key = f"{product_name}|{capacity}"
+                            existing_value = stock_results["최근입력"]["입력용"].get(input_key, 0)
+                        
+                        label_text = f"{capacity}" if capacity else "기본 용량"
+                        stock_input[f"{product_name}|{capacity}"] = st.number_input(
+                            label_text,
+                            min_value=0,
+                            value=existing_value,
+                            step=1,
+                            key=f"stock_{product_name}_{capacity}"
+                        )
+            else:
+                # 단일 용량인 경우
+                capacity, product_key = capacities[0]
+                
+                # 기존 재고 값 가져오기 (있다면)
+                existing_value = 0
+                if stock_results and stock_results.get("최근입력"):
+                    input_key = f"{product_name}|{capacity}"
+                    existing_value = stock_results["최근입력"]["입력용"].get(input_key, 0)
+                
+                label_text = f"{capacity}" if capacity else "기본 용량"  
+                stock_input[f"{product_name}|{capacity}"] = st.number_input(
+                    label_text,
+                    min_value=0,
+                    value=existing_value,
+                    step=1,
+                    key=f"stock_{product_name}_{capacity}"
+                )            
+        # 저장 버튼
+        submitted = st.form_submit_button("💾 재고 저장", help="입력한 재고 수량을 저장합니다")
+        
+        if submitted:
+            # 현재 재고 이력 로드
+            current_stock = stock_results if stock_results else {}
+            
+            # 새로운 입력 이력 생성 (조각 재실행 시에도 저장 시점 기준)
+            now = datetime.now(KST)
+            now_str = now.strftime("%Y-%m-%d %H:%M:%S")
+            new_entry = {
+                "입력일시": now_str,
+                "입력용": stock_input.copy(),
+                "출고반영": False  # 수동 입력 표시
+            }
+            
+            # 최근 재고 + 이번 달 이력에 저장
+            commit_message = f"재고 입력 {today_date_label} {now.strftime('%H:%M')}"
+            save_success = save_stock_entry(current_stock, new_entry, commit_message)
+            
+            if save_success:
+                st.success("✅ 재고 입력이 성공적으로 저장되었습니다!")
+                st.balloons()
+                time.sleep(1)
+                st.rerun()
+            else:
+                st.error("❌ 재고 저장 중 오류가 발생했습니다. 다시 시도해주세요.")
+
+# 세 번째 화면: 재고 관리
+def render_stock_view(loaded_data):
+    """재고 관리 화면"""
     st.header("📊 재고 관리")
     
-    # 재고 데이터 로드
-    with st.spinner('📡 재고 데이터 로드 중...'):
-        stock_results, stock_last_update = load_stock_data()
+    # 재고 데이터
+    stock_results, stock_last_update = loaded_data["stock"]
     
     # 한국 시간 기준 날짜 정보
     today = datetime.now(KST)
@@ -1151,30 +1722,11 @@ with tab3:
     weekday = weekdays[today.weekday()]
     today_date_label = today.strftime(f"%m월 %d일 ({weekday})")
     
-    # 전체 상품 목록 (항상 표시될 모든 제품) - 출고 현황과 관계없이
-    ALL_PRODUCTS = [
-        "단호박식혜 1.5L",
-        "단호박식혜 1L",
-        "단호박식혜 240ml",
-        "식혜 1.5L",
-        "식혜 1L",
-        "식혜 240ml",
-        "수정과 500ml",
-        "밥알없는 단호박식혜 1.5L",
-        "밥알없는 단호박식혜 1L",
-        "밥알없는 단호박식혜 240ml",
-        "밥알없는 식혜 1.5L",
-        "밥알없는 식혜 1L",
-        "밥알없는 식혜 240ml",
-        "플레인 쌀요거트 1L",
-        "플레인 쌀요거트 200ml"
-    ]
-    
-    # 모든 상품을 기본으로 설정
-    product_keys = set(ALL_PRODUCTS)
+    # 모든 상품을 기본으로 설정 (카탈로그 전체 상품 - 출고 현황과 관계없이 항상 표시)
+    product_keys = set(CATALOG_PRODUCTS)
     
     # 출고 현황에 있는 추가 상품들도 포함 (혹시 누락된 것들을 위해)
-    shipment_results, _ = load_shipment_data()
+    shipment_results, _ = loaded_data["shipment"]
     if shipment_results:
         product_keys.update(shipment_results.keys())
     
@@ -1185,73 +1737,7 @@ with tab3:
 
         # 출고 현황 반영 버튼 추가
         if shipment_results:
-            st.markdown("### 📦 출고 현황 반영")
-            
-            col1, col2 = st.columns([3, 1])
-            with col1:
-                st.info("💡 **출고 현황 반영**: 현재 재고에서 출고된 수량을 자동으로 차감하여 실제 재고량을 계산합니다.")
-            with col2:
-                st.markdown("<br>", unsafe_allow_html=True)
-                if st.button("📦 출고 현황 반영", help="출고된 수량만큼 재고를 자동으로 차감합니다"):
-                    # 현재 재고 이력 로드
-                    current_stock = stock_results if stock_results else {}
-                    
-                    # 최신 재고 입력 가져오기
-                    latest_stock = {}
-                    if current_stock.get("최근입력"):
-                        latest_stock = current_stock["최근입력"]["입력용"].copy()
-                    
-                    # 출고 현황 적용
-                    updated_stock = {}
-                    for product_key in product_keys:
-                        # 상품명과 용량 분리
-                        parts = product_key.strip().split()
-                        if len(parts) >= 2 and re.match(r'\d+(?:\.\d+)?(?:ml|L)', parts[-1]):
-                            product_name = ' '.join(parts[:-1])
-                            capacity = parts[-1]
-                        else:
-                            product_name = product_key
-                            capacity = ""
-                        
-                        input_key = f"{product_name}|{capacity}"
-                        
-                        # 현재 재고량
-                        current_qty = latest_stock.get(input_key, 0)
-                        
-                        # 출고량 (shipment_results에서 찾기)
-                        shipment_qty = shipment_results.get(product_key, 0)
-                        
-                        # 차감 계산 (0 이하로 내려가지 않게)
-                        final_qty = max(0, current_qty - shipment_qty)
-                        updated_stock[input_key] = final_qty
-                    
-                    # 새로운 입력 이력 생성
-                    now_str = today.strftime("%Y-%m-%d %H:%M:%S")
-                    new_entry = {
-                        "입력일시": now_str,
-                        "입력용": updated_stock.copy(),
-                        "출고반영": True  # 출고 반영 표시
-                    }
-                    
-                    # 이력 업데이트
-                    if "이력" not in current_stock:
-                        current_stock["이력"] = []
-                    
-                    # 최신 입력을 맨 앞에 추가
-                    current_stock["이력"].insert(0, new_entry)
-                    current_stock["최근입력"] = new_entry
-                    
-                    # GitHub에 저장
-                    commit_message = f"출고 현황 반영 {today_date_label} {today.strftime('%H:%M')}"
-                    save_success = save_stock_data(current_stock)
-                    
-                    if save_success:
-                        st.success("✅ 출고 현황이 재고에 성공적으로 반영되었습니다!")
-                        st.balloons()
-                        time.sleep(1)
-                        st.rerun()
-                    else:
-                        st.error("❌ 출고 현황 반영 중 오류가 발생했습니다. 다시 시도해주세요.")
+            render_shipment_reflection(stock_results, shipment_results, product_keys, today_date_label)
 
         # 먼저 재고 현황 표시
         if stock_results and stock_results.get("최근입력"):
@@ -1281,109 +1767,27 @@ with tab3:
 
             for product_key, quantity in latest_entry["입력용"].items():
                 if quantity > 0:  # 수량이 0보다 큰 경우만 표시
-                    product_name, capacity = product_key.split("|", 1)
-                    full_product_name = f"{product_name} {capacity}".strip()
+                    sku = get_sku_by_input_key(product_key)
                     
                     # 임계값 확인 (표시하지 않고 색상 결정용)
-                    threshold = STOCK_THRESHOLDS.get(full_product_name, 0)
-                    is_low_stock = quantity <= threshold and threshold > 0
+                    is_low_stock = quantity <= sku.threshold and sku.threshold > 0
                     
                     if is_low_stock:
-                        low_stock_items.append(f"{full_product_name} ({quantity}개)")
+                        low_stock_items.append(f"{sku.key} ({quantity}개)")
                     
-                    if product_name not in stock_groups:
-                        stock_groups[product_name] = []
+                    if sku.product not in stock_groups:
+                        stock_groups[sku.product] = []
                     
-                    stock_groups[product_name].append({
-                        "용량": capacity,
+                    stock_groups[sku.product].append({
+                        "SKU": sku,
                         "수량": quantity,
                         "위험": is_low_stock
                     })
 
-            # 상품별 카드 형태로 재고 현황 표시
-            for product_name, capacities in stock_groups.items():
-                # 상품명에 따라 색상 결정 (출고 현황 탭과 동일한 로직)
-                if "밥알없는 단호박식혜" in product_name:
-                    # 밥알없는 단호박식혜 - 진한 노란색
-                    card_color = "linear-gradient(135deg, #ffb300 0%, #ff8f00 100%)"
-                    border_color = "#ff6f00"
-                    text_color = "#4a4a4a"
-                elif "단호박식혜" in product_name:
-                    # 일반 단호박식혜 - 기본 노란색
-                    card_color = "linear-gradient(135deg, #ffd700 0%, #ffb300 100%)"
-                    border_color = "#ff8f00"
-                    text_color = "#4a4a4a"
-                elif "밥알없는 식혜" in product_name:
-                    # 밥알없는 식혜 - 연한 갈색
-                    card_color = "linear-gradient(135deg, #deb887 0%, #d2b48c 100%)"
-                    border_color = "#cd853f"
-                    text_color = "#4a4a4a"
-                elif "식혜" in product_name and "단호박" not in product_name:
-                    # 일반 식혜 - 기본 갈색
-                    card_color = "linear-gradient(135deg, #d2b48c 0%, #bc9a6a 100%)"
-                    border_color = "#8b7355"
-                    text_color = "#4a4a4a"
-                elif "수정과" in product_name:
-                    # 수정과 - 진갈색
-                    card_color = "linear-gradient(135deg, #8b4513 0%, #654321 100%)"
-                    border_color = "#654321"
-                    text_color = "#ffffff"
-                elif "플레인" in product_name or "쌀요거트" in product_name:
-                    # 플레인 쌀요거트 - 검정색
-                    card_color = "linear-gradient(135deg, #2c2c2c 0%, #1a1a1a 100%)"
-                    border_color = "#000000"
-                    text_color = "#ffffff"
-                else:
-                    # 기타 상품 - 기본 초록색
-                    card_color = "linear-gradient(135deg, #e8f5e8 0%, #c8e6c9 100%)"
-                    border_color = "#4caf50"
-                    text_color = "#2e7d32"
-                
-                st.markdown(f"""
-                    <div style="background: {card_color}; 
-                                padding: 20px; border-radius: 15px; margin: 15px 0; 
-                                border-left: 5px solid {border_color};">
-                        <h4 style="margin: 0 0 15px 0; color: {text_color}; font-weight: 600;">
-                            📦 {product_name}
-                        </h4>
-                    </div>
-                """, unsafe_allow_html=True)
-                
-                # 해당 상품의 용량별 재고를 한 줄에 표시
-                cols = st.columns(len(capacities))
-                
-                for i, item in enumerate(capacities):
-                    with cols[i]:
-                        # 각 용량별로 개별적으로 색상 결정
-                        if item["위험"]:
-                            # 임계치 이하인 용량만 빨간색
-                            st.markdown(f"""
-                                <div style="text-align: center; padding: 10px; 
-                                            background: white; border-radius: 8px; 
-                                            border: 2px solid #f44336;">
-                                    <div style="font-size: 18px; color: #666; margin-bottom: 5px;">
-                                        {item["용량"]}
-                                    </div>
-                                    <div style="font-size: 24px; font-weight: bold; color: #f44336;">
-                                        {item["수량"]}개
-                                    </div>
-                                </div>
-                            """, unsafe_allow_html=True)
-                        else:
-                            # 정상 재고는 초록색
-                            st.markdown(f"""
-                                <div style="text-align: center; padding: 10px; 
-                                            background: white; border-radius: 8px; 
-                                            border: 2px solid #4caf50;">
-                                    <div style="font-size: 18px; color: #666; margin-bottom: 5px;">
-                                        {item["용량"]}
-                                    </div>
-                                    <div style="font-size: 24px; font-weight: bold; color: #4caf50;">
-                                        {item["수량"]}개
-                                    </div>
-                                </div>
-                            """, unsafe_allow_html=True)
-                                
+            # 상품별 카드 형태로 재고 현황 표시 (전체 카드를 한 번에)
+            if stock_groups:
+                st.markdown(build_stock_cards_html(stock_groups), unsafe_allow_html=True)
+            
             # 재고 요약 정보
             total_products = sum(len(capacities) for capacities in stock_groups.values())
             total_quantity = sum(sum(item["수량"] for item in capacities) for capacities in stock_groups.values())
@@ -1446,107 +1850,23 @@ with tab3:
         st.markdown("---")
         
         # 재고 입력 폼
-        with st.form(f"stock_input_{today.strftime('%Y%m%d')}"):
-            st.markdown("#### 💾 재고 수량 입력")
-            st.markdown("상품/용량별로 현재 남은 재고 개수를 입력하세요")
-            
-            stock_input = {}
-            
-            # 상품별로 그룹화
-            product_groups = {}
-            for product_key in product_keys:
-                parts = product_key.strip().split()
-                if len(parts) >= 2 and re.match(r'\d+(?:\.\d+)?(?:ml|L)', parts[-1]):
-                    product_name = ' '.join(parts[:-1])
-                    capacity = parts[-1]
-                else:
-                    product_name = product_key
-                    capacity = ""
-                
-                if product_name not in product_groups:
-                    product_groups[product_name] = []
-                product_groups[product_name].append((capacity, product_key))
-            
-            # 상품별 입력 필드 생성
-            for product_name, capacities in sorted(product_groups.items()):
-                st.markdown(f"**📦 {product_name}**")
-                
-                # 용량별로 컬럼 생성
-                if len(capacities) > 1:
-                    cols = st.columns(len(capacities))
-                    for i, (capacity, product_key) in enumerate(capacities):
-                        with cols[i]:
-                            # 기존 재고 값 가져오기 (있다면)
-                            existing_value = 0
-                            if stock_results and stock_results.get("최근입력"):
-                                input_key = f"{product_name}|{capacity}"
-                                existing_value = stock_results["최근입력"]["입력용"].get(input_key, 0)
-                            
-                            label_text = f"{capacity}" if capacity else "기본 용량"
-                            stock_input[f"{product_name}|{capacity}"] = st.number_input(
-                                label_text,
-                                min_value=0,
-                                value=existing_value,
-                                step=1,
-                                key=f"stock_{product_name}_{capacity}"
-                            )
-                else:
-                    # 단일 용량인 경우
-                    capacity, product_key = capacities[0]
-                    
-                    # 기존 재고 값 가져오기 (있다면)
-                    existing_value = 0
-                    if stock_results and stock_results.get("최근입력"):
-                        input_key = f"{product_name}|{capacity}"
-                        existing_value = stock_results["최근입력"]["입력용"].get(input_key, 0)
-                    
-                    label_text = f"{capacity}" if capacity else "기본 용량"  
-                    stock_input[f"{product_name}|{capacity}"] = st.number_input(
-                        label_text,
-                        min_value=0,
-                        value=existing_value,
-                        step=1,
-                        key=f"stock_{product_name}_{capacity}"
-                    )            
-            # 저장 버튼
-            submitted = st.form_submit_button("💾 재고 저장", help="입력한 재고 수량을 저장합니다")
-            
-            if submitted:
-                # 현재 재고 이력 로드
-                current_stock = stock_results if stock_results else {}
-                
-                # 새로운 입력 이력 생성
-                now_str = today.strftime("%Y-%m-%d %H:%M:%S")
-                new_entry = {
-                    "입력일시": now_str,
-                    "입력용": stock_input.copy(),
-                    "출고반영": False  # 수동 입력 표시
-                }
-                
-                # 이력 업데이트
-                if "이력" not in current_stock:
-                    current_stock["이력"] = []
-                
-                # 최신 입력을 맨 앞에 추가
-                current_stock["이력"].insert(0, new_entry)
-                current_stock["최근입력"] = new_entry
-                
-                # GitHub에 저장
-                commit_message = f"재고 입력 {today_date_label} {today.strftime('%H:%M')}"
-                save_success = save_stock_data(current_stock)
-                
-                if save_success:
-                    st.success("✅ 재고 입력이 성공적으로 저장되었습니다!")
-                    st.balloons()
-                    time.sleep(1)
-                    st.rerun()
-                else:
-                    st.error("❌ 재고 저장 중 오류가 발생했습니다. 다시 시도해주세요.")
+        render_stock_input_form(stock_results, product_keys, today_date_label)
 
     else:
         st.info("📋 **재고 관리를 위해서는 먼저 출고 현황 데이터가 필요합니다.**")
         st.markdown("관리자가 출고 현황을 업로드하면 자동으로 재고 입력이 가능해집니다.")
 
+VIEW_RENDERERS = {
+    "📦 출고 현황": render_shipment_view,
+    "📦 박스 계산": render_box_view,
+    "📊 재고 관리": render_stock_view,
+}
+
+# 📡 선택한 화면에 필요한 데이터만 동시 로드 후 표시
+with st.spinner('📡 데이터 로드 중...'):
+    loaded_data = load_all_data(VIEW_DATA[active_view])
+VIEW_RENDERERS[active_view](loaded_data)
+
 # 관리자 파일 업로드 (새로운 매핑 방식)
 if is_admin:
     st.markdown("---")
@@ -1564,7 +1884,7 @@ if is_admin:
     - **재고 관리**: 출고 현황과 자동 동기화
     - **.xlsx 형식만 지원**
     
-    ✅ **새로운 기능**: 94개 케이스 완전 매핑 + 기타 제품 추적
+    ✅ **새로운 기능**: 옵션 규칙 파서 + 예외 매핑 테이블 + 기타 제품 추적
     """)
     
     uploaded_file = st.file_uploader(
@@ -1579,34 +1899,25 @@ if is_admin:
         st.session_state.last_uploaded_file = uploaded_file
 
         with st.spinner('🔒 통합 파일 보안 처리 및 영구 저장 중...'):
-            # ✅ 새로운 매핑 방식으로 출고 현황 처리
-            results, processed_files, mapping_stats = process_unified_file_new(uploaded_file)
-            
-            # ✅ 새로운 매핑 방식으로 박스 계산 처리
-            uploaded_file.seek(0)
-            df_for_box = read_excel_file_safely(uploaded_file)
-            box_results = {}
-            
-            if df_for_box is not None:
-                df_for_box = sanitize_data(df_for_box)
-                if not df_for_box.empty and '수취인이름' in df_for_box.columns:
-                    total_boxes, box_e_orders = calculate_box_requirements_new(df_for_box)
-                    
-                    box_results = {
-                        'total_boxes': dict(total_boxes),
-                        'box_e_orders': [
-                            {
-                                'recipient': order['recipient'],
-                                'quantities': dict(order['quantities']),
-                                'products': dict(order['products'])
-                            }
-                            for order in box_e_orders
-                        ]
-                    }
-                    
+            # ✅ 한 번 읽은 데이터로 출고 현황과 박스 계산을 함께 처리 (이전 업로드와 달라진 행만 반영)
+            progress = ProgressReporter()
+            previous_upload = load_all_data(UPLOAD_BASE_DATA)
+            results, processed_files, mapping_stats, box_results, upload_index = process_unified_file_new(
+                uploaded_file, progress, previous_upload
+            )
+
         # 결과 저장
-        shipment_saved = save_shipment_data(results) if results else False
-        box_saved = save_box_data(box_results) if box_results else False
+        progress.phase("persist")
+        if mapping_stats.get('incremental') and not (mapping_stats['added_rows'] or mapping_stats['removed_rows']):
+            # 이전 업로드와 같은 파일이면 저장하지 않음
+            st.info("ℹ️ 이전 업로드와 달라진 행이 없어 저장된 결과를 그대로 사용합니다")
+            upload_saved = bool(results or box_results)
+        else:
+            # ✅ 출고 현황, 박스 계산, 업로드 색인은 한 커밋으로 저장 (서로 어긋난 상태가 생기지 않도록)
+            upload_saved = save_upload_results(results, box_results, upload_index)
+        shipment_saved = upload_saved and bool(results)
+        box_saved = upload_saved and bool(box_results)
+        progress.close()
         
         # ✅ 매핑 성공률 및 기타 제품 표시
         if mapping_stats:
@@ -1639,6 +1950,8 @@ if is_admin:
             if mapping_stats['failed_mappings'] > 0:
                 with st.expander(f"⚠️ 기타로 분류된 제품 내역 ({mapping_stats['failed_mappings']}건)", expanded=False):
                     st.warning("다음 제품들이 '기타'로 분류되었습니다. 제품 매핑 테이블 업데이트가 필요할 수 있습니다.")
+                    if mapping_stats.get('incremental'):
+                        st.caption("변경분만 반영한 업로드라 이번에 새로 추가된 행만 표시합니다.")
                     
                     failure_data = []
                     for failure in mapping_stats['failure_details']:
@@ -1673,20 +1986,21 @@ if is_admin:
             with st.expander("🔧 매핑 모듈 정보", expanded=False):
                 try:
                     mapping_stats = get_mapping_stats()
-                    st.success(f"📊 총 {mapping_stats['total_cases']}개의 매핑 케이스 로드됨")
+                    st.success(f"📊 예외 매핑 케이스 {mapping_stats['total_cases']}개 + 옵션 규칙 파서")
                     
                     col1, col2 = st.columns(2)
                     with col1:
-                        st.markdown("**제품별 케이스 수:**")
+                        st.markdown("**제품별 예외 케이스 수:**")
                         for product, count in sorted(mapping_stats['product_stats'].items()):
                             st.write(f"- {product}: {count}개")
                     
                     with col2:
                         st.markdown("**🏗️ 모듈 정보:**")
-                        st.write("- **매핑 방식**: O(1) 해시테이블")
-                        st.write("- **정확도**: 94개 케이스 완전 매핑")
+                        st.write("- **매핑 방식**: 예외 테이블 → 옵션 규칙 파서 (결과 캐시)")
+                        st.write("- **규칙**: 개수(N개/N병), 용량(ml/L), 제품 분류 추출")
                         st.write("- **실패 처리**: 기타 제품 자동 분류")
-                        st.write("- **패턴**: 싱글톤")
+                        st.write("- **패턴**: 싱글톤 (첫 조회 시 테이블 생성)")
+                        st.write(f"- **정의 버전**: {mapping_stats['version']}")
                         
                 except Exception as e:
                     st.error(f"❌ 매핑 모듈 로드 실패: {e}")
@@ -1807,26 +2121,31 @@ fortune_options = [
 ]
 
 # 운세 버튼 및 애니메이션 효과
-if st.button("🎲 오늘의 운세 확인하기", key="fortune"):
-    
-    # 1단계: 주사위 애니메이션 (스피너 사용)
-    with st.spinner("🎲 운명의 주사위가 굴러가는 중..."):
-        time.sleep(1.5)  # 1.5초 대기로 긴장감 조성
-    
-    # 2단계: 결과 알림
-    st.success("🎯 당신의 운세가 결정되었습니다!")
-    
-    # 3단계: 운세 선택 및 분석
-    today_fortune = random.choice(fortune_options)
-    lines = today_fortune.strip().split('\n')
-    summary = lines[0]  # 한줄평
-    details = '\n'.join(lines[1:]).strip()  # 세부사항
-    
-    
-    # 4단계: 운세 내용 표시
-    with st.container():
-        st.markdown("#### 🔮 오늘의 한줄평")
-        st.info(summary)
+@st.fragment
+def render_fortune():
+    """운세 버튼 (클릭 시 이 영역만 다시 실행)"""
+    if st.button("🎲 오늘의 운세 확인하기", key="fortune"):
+        
+        # 1단계: 주사위 애니메이션 (스피너 사용)
+        with st.spinner("🎲 운명의 주사위가 굴러가는 중..."):
+            time.sleep(1.5)  # 1.5초 대기로 긴장감 조성
         
-        st.markdown("#### 📝 세부사항")
-        st.success(details)
+        # 2단계: 결과 알림
+        st.success("🎯 당신의 운세가 결정되었습니다!")
+        
+        # 3단계: 운세 선택 및 분석
+        today_fortune = random.choice(fortune_options)
+        lines = today_fortune.strip().split('\n')
+        summary = lines[0]  # 한줄평
+        details = '\n'.join(lines[1:]).strip()  # 세부사항
+        
+        
+        # 4단계: 운세 내용 표시
+        with st.container():
+            st.markdown("#### 🔮 오늘의 한줄평")
+            st.info(summary)
+            
+            st.markdown("#### 📝 세부사항")
+            st.success(details)
+
+render_fortune()